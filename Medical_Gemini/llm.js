@@ -0,0 +1,259 @@
+// llm.js — shared upstream client for /ask-ai
+// Keep-alive connection pool, bounded concurrency, jittered exponential
+// backoff on 429/5xx and failover between Gemini and OpenRouter.
+// Identical questions (after normalization) share one upstream call while
+// it is in flight and are answered from an LRU cache afterwards; the wait
+// queue is bounded and waiting times out, so a burst fails fast with
+// OverloadedError instead of piling up behind the quota.
+// Base URLs come from env so the client can be pointed at a local stub.
+import "dotenv/config";
+import http from "http";
+import https from "https";
+import fetch from "node-fetch";
+
+const SYSTEM_PROMPT = "You are a medical assistant. Answer shortly in Hinglish.";
+const RETRY_STATUS = new Set([429, 500, 502, 503, 504]);
+
+const httpAgent = new http.Agent({ keepAlive: true, maxSockets: 8 });
+const httpsAgent = new https.Agent({ keepAlive: true, maxSockets: 8 });
+const agent = (url) => (url.protocol === "http:" ? httpAgent : httpsAgent);
+
+class RetryableError extends Error {
+  constructor(message, retryAfter) {
+    super(message);
+    this.retryAfter = retryAfter;
+  }
+}
+
+// 🔹 PROVIDERS
+const providers = {
+  gemini: {
+    key: () => process.env.GEMINI_API_KEY,
+    request: (query) => ({
+      url: `${process.env.GEMINI_BASE_URL || "https://generativelanguage.googleapis.com/v1beta"}/models/${process.env.GEMINI_MODEL || "gemini-2.5-flash"}:generateContent`,
+      headers: { "x-goog-api-key": process.env.GEMINI_API_KEY },
+      body: {
+        contents: [{ parts: [{ text: `${SYSTEM_PROMPT}\nUser: ${query}\nAnswer:` }] }],
+        generationConfig: { temperature: 0.5, maxOutputTokens: 300 }
+      }
+    }),
+    reply: (data) => data?.candidates?.[0]?.content?.parts?.[0]?.text
+  },
+  openrouter: {
+    key: () => process.env.OPENROUTER_API_KEY,
+    request: (query) => ({
+      url: `${process.env.OPENROUTER_BASE_URL || "https://openrouter.ai/api/v1"}/chat/completions`,
+      headers: { Authorization: `Bearer ${process.env.OPENROUTER_API_KEY}` },
+      body: {
+        model: process.env.OPENROUTER_MODEL || "mistralai/mistral-7b-instruct:free",
+        messages: [
+          { role: "system", content: SYSTEM_PROMPT },
+          { role: "user", content: query }
+        ],
+        temperature: 0.5
+      }
+    }),
+    reply: (data) => data?.choices?.[0]?.message?.content
+  }
+};
+
+// 🔹 CONCURRENCY LIMIT
+const MAX_CONCURRENCY = Number(process.env.LLM_MAX_CONCURRENCY || 4);
+const MAX_QUEUE = Number(process.env.LLM_MAX_QUEUE || 32);
+const QUEUE_TIMEOUT_MS = Number(process.env.LLM_QUEUE_TIMEOUT_MS || 15000);
+let active = 0;
+const waiting = [];
+const queue = { rejected: 0, timedOut: 0, maxWaiting: 0 };
+
+export class OverloadedError extends Error {}
+
+function acquire() {
+  if (active < MAX_CONCURRENCY) {
+    active++;
+    return Promise.resolve();
+  }
+  if (waiting.length >= MAX_QUEUE) {
+    queue.rejected++;
+    return Promise.reject(new OverloadedError("LLM queue full"));
+  }
+  return new Promise((resolve, reject) => {
+    const waiter = { resolve };
+    waiter.timer = setTimeout(() => {
+      waiting.splice(waiting.indexOf(waiter), 1);
+      queue.timedOut++;
+      reject(new OverloadedError("Timed out waiting for an LLM slot"));
+    }, QUEUE_TIMEOUT_MS);
+    waiting.push(waiter);
+    queue.maxWaiting = Math.max(queue.maxWaiting, waiting.length);
+  });
+}
+
+function release() {
+  // The finishing call hands its slot straight to the next waiter.
+  const next = waiting.shift();
+  if (next) {
+    clearTimeout(next.timer);
+    next.resolve();
+  } else {
+    active--;
+  }
+}
+
+async function withSlot(fn) {
+  await acquire();
+  try {
+    return await fn();
+  } finally {
+    release();
+  }
+}
+
+// 🔹 ANSWER CACHE + COALESCING
+const CACHE_SIZE = Number(process.env.LLM_CACHE_SIZE || 500);
+const CACHE_TTL_MS = Number(process.env.LLM_CACHE_TTL_MS || 10 * 60 * 1000);
+const cache = new Map();         // key -> { value, expires }; Map order = LRU order
+const inflight = new Map();      // key -> Promise
+const lookups = { hits: 0, coalesced: 0, misses: 0 };
+
+const normalize = (query) =>
+  query.toLowerCase().replace(/\s+/g, " ").trim().replace(/[\s?.!]+$/, "");
+
+function cacheGet(key) {
+  const entry = cache.get(key);
+  if (!entry) return undefined;
+  cache.delete(key);
+  if (entry.expires < Date.now()) return undefined;
+  cache.set(key, entry);
+  return entry.value;
+}
+
+function cachePut(key, value) {
+  cache.delete(key);
+  cache.set(key, { value, expires: Date.now() + CACHE_TTL_MS });
+  if (cache.size > CACHE_SIZE) cache.delete(cache.keys().next().value);
+}
+
+// 🔹 STATS
+const stats = {};
+for (const name of Object.keys(providers)) {
+  stats[name] = { ok: 0, errors: 0, retries: 0, latencies: [] };
+}
+
+function record(name, ms) {
+  const l = stats[name].latencies;
+  l.push(ms);
+  if (l.length > 200) l.shift();
+}
+
+function percentile(values, p) {
+  if (!values.length) return null;
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+}
+
+export function llmStats() {
+  const total = lookups.hits + lookups.coalesced + lookups.misses;
+  const out = {
+    queue: { active, waiting: waiting.length, limit: MAX_CONCURRENCY, max_queue: MAX_QUEUE, ...queue },
+    cache: {
+      size: cache.size,
+      ...lookups,
+      hit_rate: total ? lookups.hits / total : null,
+      coalesced_rate: total ? lookups.coalesced / total : null
+    }
+  };
+  for (const [name, s] of Object.entries(stats)) {
+    out[name] = {
+      ok: s.ok,
+      errors: s.errors,
+      retries: s.retries,
+      p50_ms: percentile(s.latencies, 50),
+      p95_ms: percentile(s.latencies, 95)
+    };
+  }
+  return out;
+}
+
+// 🔹 CALLS
+const RETRIES = Number(process.env.LLM_RETRIES || 2);
+const BACKOFF_MS = 500;
+const MAX_BACKOFF_MS = 8000;
+const TIMEOUT_MS = Number(process.env.LLM_TIMEOUT_MS || 30000);
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+async function callOnce(name, query) {
+  const { url, headers, body } = providers[name].request(query);
+  const started = Date.now();
+  let response;
+  try {
+    response = await fetch(url, {
+      method: "POST",
+      headers: { "Content-Type": "application/json", ...headers },
+      body: JSON.stringify(body),
+      agent,
+      signal: AbortSignal.timeout(TIMEOUT_MS)
+    });
+  } catch (err) {
+    throw new RetryableError(`${name}: ${err.message}`);
+  }
+  if (RETRY_STATUS.has(response.status)) {
+    await response.arrayBuffer();
+    const retryAfter = Number(response.headers.get("retry-after")) * 1000 || 0;
+    throw new RetryableError(`${name} HTTP ${response.status}`, retryAfter);
+  }
+  if (!response.ok) {
+    await response.arrayBuffer();
+    throw new Error(`${name} HTTP ${response.status}`);
+  }
+  const data = await response.json();
+  record(name, Date.now() - started);
+  return providers[name].reply(data);
+}
+
+export async function askLLM(query, order = ["gemini", "openrouter"]) {
+  const key = `${order.join(",")}|${normalize(query)}`;
+  const cached = cacheGet(key);
+  if (cached) {
+    lookups.hits++;
+    return { ...cached, cached: true };
+  }
+  let pending = inflight.get(key);
+  if (pending) {
+    lookups.coalesced++;
+    // Shared an in-flight call: not a cache hit, reported separately.
+    return { ...(await pending), coalesced: true };
+  }
+  lookups.misses++;
+  pending = callProviders(query, order);
+  inflight.set(key, pending);
+  try {
+    const answer = await pending;
+    if (answer.reply) cachePut(key, answer);
+    return answer;
+  } finally {
+    inflight.delete(key);
+  }
+}
+
+async function callProviders(query, order) {
+  const errors = [];
+  for (const name of order.filter((n) => providers[n].key())) {
+    for (let attempt = 0; attempt <= RETRIES; attempt++) {
+      try {
+        const reply = await withSlot(() => callOnce(name, query));
+        stats[name].ok++;
+        return { reply, provider: name };
+      } catch (err) {
+        if (err instanceof OverloadedError) throw err;
+        stats[name].errors++;
+        errors.push(err.message);
+        if (!(err instanceof RetryableError) || attempt === RETRIES) break;
+        stats[name].retries++;
+        const cap = Math.min(MAX_BACKOFF_MS, BACKOFF_MS * 2 ** attempt);
+        await sleep(Math.max(Math.random() * cap, Math.min(err.retryAfter, MAX_BACKOFF_MS)));
+      }
+    }
+  }
+  throw new Error(errors.join("; ") || "No LLM provider configured");
+}
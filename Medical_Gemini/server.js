@@ -1,13 +1,15 @@
 import express from "express";
 import cors from "cors";
-import fetch from "node-fetch";
 import dotenv from "dotenv";
+import { askLLM, llmStats, OverloadedError } from "./llm.js";
+import { mountVitals } from "./vitals.js";
 
 dotenv.config();
 
 const app = express();
 app.use(cors());
-app.use(express.json());
+// vitals batches carry samples for a whole ward
+app.use(express.json({ limit: "5mb" }));
 
 const PORT = process.env.PORT || 5000;
 
@@ -25,45 +27,34 @@ app.post("/ask-ai", async (req, res) => {
       return res.status(400).json({ error: "Query missing" });
     }
 
-    // Gemini API call
-    const response = await fetch(
-      `https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent`,
-      {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-          "Authorization": `Bearer ${process.env.GEMINI_API_KEY}`
-        },
-        body: JSON.stringify({
-          contents: [
-            {
-              parts: [
-                {
-                  text: `You are a medical assistant. Answer shortly in Hinglish.\nUser: ${query}\nAnswer:`
-                }
-              ]
-            }
-          ],
-          temperature: 0.5,
-          maxOutputTokens: 300
-        })
-      }
-    );
+    // Gemini first, OpenRouter as failover (pooled, retried, coalesced, cached)
+    const { reply, provider, cached, coalesced } = await askLLM(query);
 
-    const data = await response.json();
-
-    const reply =
-      data?.candidates?.[0]?.content?.parts?.[0]?.text ||
-      "No response from Gemini";
-
-    res.json({ reply });
+    res.json({
+      reply: reply || "No response from Gemini",
+      provider,
+      cached: Boolean(cached),
+      coalesced: Boolean(coalesced)
+    });
 
   } catch (err) {
+    if (err instanceof OverloadedError) {
+      res.set("Retry-After", "5");
+      return res.status(503).json({ error: "AI busy, thodi der baad try karein" });
+    }
     console.error("Gemini API Error:", err);
     res.status(500).json({ error: "Gemini API failed" });
   }
 });
 
+// 🔹 LLM PROVIDER STATS
+app.get("/llm-stats", (req, res) => {
+  res.json(llmStats());
+});
+
+// 🔹 VITALS INGESTION + SSE STREAMS
+mountVitals(app);
+
 app.listen(PORT, () => {
   console.log(`✅ Gemini backend running on port ${PORT}`);
 });
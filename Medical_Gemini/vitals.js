@@ -0,0 +1,279 @@
+// vitals.js — vitals ingestion + Server-Sent Events streaming
+// Samples for many patients come in as batched POSTs and are kept in
+// per-patient typed-array ring buffers.  Subscribers get SSE streams per
+// patient or for the whole ward.  Events are flushed on a fixed tick and
+// carry column arrays ({t:[..],HR:[..],...}) rather than one object per
+// sample.  A slow client is never written to while its socket is full: the
+// patient stream buffers a bounded backlog, the ward stream keeps only the
+// newest sample per patient, and a client stuck for too long is dropped.
+// At most MAX_PATIENTS rings are kept: patients without samples or
+// subscribers for IDLE_MS are evicted, and new ones past the limit refused.
+
+const VITALS = ["HR", "SpO2", "BP", "Temp"];
+const ARRAYS = { t: Float64Array, HR: Int16Array, SpO2: Int16Array, BP: Int16Array, Temp: Float32Array };
+
+const CAPACITY = Number(process.env.VITALS_CAPACITY || 3600);
+const FLUSH_MS = Number(process.env.VITALS_FLUSH_MS || 250);
+const HEARTBEAT_MS = 15000;
+const MAX_BACKLOG = 2000;        // samples kept for one congested patient client
+const MAX_STALL_MS = 30000;      // congested longer than this: disconnect
+const MAX_PATIENTS = Number(process.env.VITALS_MAX_PATIENTS || 5000);
+const IDLE_MS = Number(process.env.VITALS_IDLE_MS || 3600000);
+
+// 🔹 STORAGE
+class Ring {
+  constructor(capacity) {
+    this.capacity = capacity;
+    this.count = 0;              // samples ever appended = event id
+    this.cols = {};
+    for (const [name, Type] of Object.entries(ARRAYS)) this.cols[name] = new Type(capacity);
+  }
+
+  push(sample) {
+    const i = this.count % this.capacity;
+    for (const name of Object.keys(ARRAYS)) this.cols[name][i] = sample[name];
+    this.count++;
+  }
+
+  // Column arrays of samples with id > since (bounded by what is retained).
+  since(since = 0, limit = this.capacity) {
+    const start = Math.max(since, this.count - this.capacity, this.count - limit);
+    const out = {};
+    for (const name of Object.keys(ARRAYS)) out[name] = [];
+    for (let k = start; k < this.count; k++) {
+      const i = k % this.capacity;
+      for (const name of Object.keys(ARRAYS)) out[name].push(this.cols[name][i]);
+    }
+    out.Temp = out.Temp.map((v) => Math.round(v * 100) / 100);
+    return out;
+  }
+
+  latest() {
+    if (!this.count) return null;
+    const i = (this.count - 1) % this.capacity;
+    const row = {};
+    for (const name of Object.keys(ARRAYS)) row[name] = this.cols[name][i];
+    row.Temp = Math.round(row.Temp * 100) / 100;
+    return row;
+  }
+}
+
+const patients = new Map();      // pid -> { info, ring }
+const stats = { received: 0, rejected: 0, events: 0, dropped: 0, disconnected: 0, evicted: 0 };
+
+// Existing or new patient; null when the ward is full even after evicting.
+function patient(pid) {
+  let p = patients.get(pid);
+  if (!p) {
+    if (patients.size >= MAX_PATIENTS && !evictIdle()) return null;
+    p = { info: { pid }, ring: new Ring(CAPACITY), seen: Date.now() };
+    patients.set(pid, p);
+  }
+  return p;
+}
+
+// Drops patients without samples or subscribers for IDLE_MS; returns how many.
+function evictIdle() {
+  const watched = new Set();
+  for (const client of clients) if (client.pid) watched.add(client.pid);
+  const cutoff = Date.now() - IDLE_MS;
+  let evicted = 0;
+  for (const [pid, p] of patients) {
+    if (p.seen < cutoff && !watched.has(pid)) {
+      patients.delete(pid);
+      evicted++;
+    }
+  }
+  stats.evicted += evicted;
+  return evicted;
+}
+
+// Accepts {samples:[{pid,t,HR,...}]} or columns {pid:[..],t:[..],HR:[..],...}.
+function parseBatch(body) {
+  if (Array.isArray(body?.samples)) return body.samples;
+  if (Array.isArray(body?.pid)) {
+    return body.pid.map((pid, i) => {
+      const s = { pid, t: body.t?.[i] };
+      for (const v of VITALS) s[v] = body[v]?.[i];
+      return s;
+    });
+  }
+  return null;
+}
+
+function valid(s) {
+  return s && typeof s.pid === "string" && s.pid && VITALS.every((v) => Number.isFinite(s[v]));
+}
+
+// 🔹 SUBSCRIBERS
+const clients = new Set();       // { res, pid|null, since, pending, congested, stalledAt }
+let dirty = new Set();           // pids with samples since the last flush
+
+function ingest(samples) {
+  const now = Date.now();
+  let accepted = 0;
+  for (const s of samples) {
+    if (!valid(s)) {
+      stats.rejected++;
+      continue;
+    }
+    const p = patient(s.pid);
+    if (!p) {
+      stats.rejected++;
+      continue;
+    }
+    p.ring.push({ ...s, t: Number.isFinite(s.t) ? s.t : now });
+    p.seen = now;
+    dirty.add(s.pid);
+    accepted++;
+  }
+  stats.received += accepted;
+  return accepted;
+}
+
+function send(client, event, data, id) {
+  const chunk = `${id !== undefined ? `id: ${id}\n` : ""}event: ${event}\ndata: ${JSON.stringify(data)}\n\n`;
+  stats.events++;
+  if (!client.res.write(chunk)) {
+    client.congested = true;
+    client.stalledAt = Date.now();
+  }
+}
+
+function flushPatient(client) {
+  const p = patients.get(client.pid);
+  if (!p) return;
+  // The ring was recreated (evicted, or the server restarted): start over.
+  if (client.since > p.ring.count) client.since = 0;
+  if (p.ring.count <= client.since) return;
+  if (client.congested) {
+    // Past the backlog the oldest samples are skipped, not queued forever.
+    const behind = p.ring.count - client.since;
+    if (behind > MAX_BACKLOG) {
+      stats.dropped += behind - MAX_BACKLOG;
+      client.since = p.ring.count - MAX_BACKLOG;
+    }
+    return;
+  }
+  send(client, "vitals", p.ring.since(client.since), p.ring.count);
+  client.since = p.ring.count;
+}
+
+function flushWard(client, changed) {
+  // Only the newest sample per patient: a congested client just skips ticks.
+  for (const pid of changed) client.pending.add(pid);
+  if (client.congested || !client.pending.size) return;
+  const out = { pid: [], t: [] };
+  for (const v of VITALS) out[v] = [];
+  for (const pid of client.pending) {
+    const row = patients.get(pid)?.ring.latest();
+    if (!row) continue;
+    out.pid.push(pid);
+    for (const name of Object.keys(ARRAYS)) out[name].push(row[name]);
+  }
+  client.pending.clear();
+  send(client, "ward", out);
+}
+
+function flush() {
+  const changed = dirty;
+  dirty = new Set();
+  const now = Date.now();
+  for (const client of clients) {
+    if (client.congested && now - client.stalledAt > MAX_STALL_MS) {
+      stats.disconnected++;
+      client.res.end();
+      continue;
+    }
+    if (client.pid) {
+      if (changed.has(client.pid) || client.since !== (patients.get(client.pid)?.ring.count ?? client.since)) {
+        flushPatient(client);
+      }
+    } else {
+      flushWard(client, changed);
+    }
+  }
+}
+
+function subscribe(req, res, pid) {
+  res.writeHead(200, {
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-cache, no-transform",
+    Connection: "keep-alive",
+    "X-Accel-Buffering": "no"
+  });
+  res.write("retry: 2000\n\n");
+  req.socket.setNoDelay(true);
+
+  const client = { res, pid, since: 0, pending: new Set(), congested: false, stalledAt: 0 };
+  if (pid) {
+    // Resume after a reconnect, otherwise start with the retained history.
+    const last = Number(req.get("Last-Event-ID") ?? req.query.since);
+    // An id past the ring's count is from before a restart (or eviction).
+    client.since = Number.isFinite(last) && last <= (patients.get(pid)?.ring.count || 0) ? last : 0;
+  } else {
+    for (const key of patients.keys()) client.pending.add(key);
+  }
+  res.on("drain", () => {
+    client.congested = false;
+  });
+  clients.add(client);
+  req.on("close", () => clients.delete(client));
+  if (pid) flushPatient(client);
+  else flushWard(client, []);
+}
+
+setInterval(flush, FLUSH_MS).unref();
+setInterval(evictIdle, Math.min(IDLE_MS, 60000)).unref();
+setInterval(() => {
+  for (const client of clients) if (!client.congested) client.res.write(": ping\n\n");
+}, HEARTBEAT_MS).unref();
+
+// 🔹 ROUTES
+export function mountVitals(app) {
+  // Batched ingestion: one request carries samples for many patients.
+  app.post("/vitals", (req, res) => {
+    const samples = parseBatch(req.body);
+    if (!samples) {
+      return res.status(400).json({ error: "Expected {samples:[...]} or column arrays" });
+    }
+    const accepted = ingest(samples);
+    res.status(202).json({ accepted, rejected: samples.length - accepted });
+  });
+
+  app.post("/patients", (req, res) => {
+    const { pid, name, age, gender } = req.body || {};
+    if (!pid || typeof pid !== "string") {
+      return res.status(400).json({ error: "pid missing" });
+    }
+    const p = patient(pid);
+    if (!p) {
+      return res.status(429).json({ error: `Too many patients (max ${MAX_PATIENTS})` });
+    }
+    Object.assign(p.info, { name, age, gender });
+    p.seen = Date.now();
+    res.status(201).json(p.info);
+  });
+
+  app.get("/patients", (req, res) => {
+    res.json([...patients.values()].map(({ info, ring }) => ({ ...info, samples: ring.count, latest: ring.latest() })));
+  });
+
+  // Retained history as column arrays (?since=<event id>&limit=<n>).
+  app.get("/vitals/:pid", (req, res) => {
+    const p = patients.get(req.params.pid);
+    if (!p) return res.status(404).json({ error: "Unknown patient" });
+    const since = Number(req.query.since) || 0;
+    const limit = Number(req.query.limit) || CAPACITY;
+    res.json({ id: p.ring.count, ...p.ring.since(since, limit) });
+  });
+
+  app.get("/stream/vitals/:pid", (req, res) => subscribe(req, res, req.params.pid));
+  app.get("/stream/ward", (req, res) => subscribe(req, res, null));
+
+  app.get("/vitals-stats", (req, res) => {
+    let congested = 0;
+    for (const c of clients) if (c.congested) congested++;
+    res.json({ patients: patients.size, clients: clients.size, congested, ...stats });
+  });
+}
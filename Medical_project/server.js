@@ -2,11 +2,14 @@
 import express from "express";
 import cors from "cors";
 import dotenv from "dotenv";
+// Shared with the Gemini backend (no dependencies of its own).
+import { mountVitals } from "../Medical_Gemini/vitals.js";
 
 dotenv.config();
 const app = express();
 app.use(cors());
-app.use(express.json());
+// vitals batches carry samples for a whole ward
+app.use(express.json({ limit: "5mb" }));
 
 const PORT = process.env.PORT || 5000;
 
@@ -14,6 +17,9 @@ app.get("/", (req, res) => {
   res.send("Backend is running!");
 });
 
+// vitals ingestion + SSE streams
+mountVitals(app);
+
 app.listen(PORT, () => {
   console.log(`Server running on port ${PORT}`);
 });
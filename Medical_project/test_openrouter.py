@@ -1,68 +1,46 @@
 import os
-import requests
-from dotenv import load_dotenv
+import sys
 import json
+from pathlib import Path
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from patient_monitor.llm import AIError, LLMClient
 
 load_dotenv()
-API_KEY = os.getenv("OPENROUTER_API_KEY")
 
-if not API_KEY:
+if not os.getenv("OPENROUTER_API_KEY"):
     print("❌ OPENROUTER_API_KEY not found")
     exit()
 
-url = "https://openrouter.ai/api/v1/chat/completions"
+# Same pooled client as the dashboard: retries 429/5xx with backoff and
+# fails over to Gemini if GEMINI_API_KEY is set too.
+client = LLMClient.from_env(order=("openrouter", "gemini"))
 
-headers = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Content-Type": "application/json",
-    "HTTP-Referer": "http://localhost",
-    "X-Title": "Hackathon Medical AI"
-}
-
-data = {
-    "model": "mistralai/mistral-7b-instruct:free",
-    "messages": [
-        {
-            "role": "system",
-            "content": "You are a medical emergency assistant."
-        },
-        {
-            "role": "user",
-            "content": "If a patient's oxygen level is 88%, what immediate steps should be taken?"
-        }
-    ],
-    "temperature": 0.6,
-    "max_tokens": 200
-}
+query = "If a patient's oxygen level is 88%, what immediate steps should be taken?"
 
 try:
-    response = requests.post(url, headers=headers, json=data, timeout=30)
-
-    print("\n🔎 Raw Status Code:", response.status_code)
-
-    resp = response.json()
-
-    print("\n🔎 Raw JSON Response:\n")
-    print(json.dumps(resp, indent=2))
-
-    if response.status_code == 200:
-        try:
-            content = resp["choices"][0]["message"]["content"]
-            if content.strip() == "":
-                raise Exception("Empty content")
-            print("\n✅ AI Response:\n")
-            print(content)
-        except:
-            print("\n⚠️ AI returned empty message.")
-            print("Fallback Response:")
-            print(
-                "• Place patient upright\n"
-                "• Ensure airway is clear\n"
-                "• Provide oxygen if available\n"
-                "• Call doctor immediately"
-            )
-    else:
-        print("\n❌ API Error")
-
-except Exception as e:
-    print("\n❌ Request Failed:", e)
+    content = client.complete(
+        query,
+        system="You are a medical emergency assistant.",
+        temperature=0.6,
+        max_tokens=200
+    )
+    if content.strip() == "":
+        raise AIError("Empty content")
+
+    print("\n✅ AI Response:\n")
+    print(content)
+
+except AIError as e:
+    print("\n⚠️ AI returned no answer:", e)
+    print("Fallback Response:")
+    print(
+        "• Place patient upright\n"
+        "• Ensure airway is clear\n"
+        "• Provide oxygen if available\n"
+        "• Call doctor immediately"
+    )
+
+print("\n🔎 Provider stats:\n")
+print(json.dumps(client.stats(), indent=2))
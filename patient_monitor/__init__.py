@@ -0,0 +1 @@
+"""Shared data path for the Smart Patient Monitoring dashboards."""
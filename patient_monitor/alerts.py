@@ -0,0 +1,125 @@
+"""Configurable, vectorized GREEN / YELLOW / RED alert rules.
+
+Rules live in a JSON file (``alert_rules.json`` next to this module, or the
+path in ``ALERT_RULES``).  Each level has a window length and per-vital
+``high`` / ``low`` limits; a sample breaches a level if any vital is past its
+limit, and the level fires once every sample in its window breaches.  Age
+groups override individual limits (patients of unknown age get the base
+limits).  Levels are listed most severe first.
+
+Evaluation gathers the last ``max(window)`` samples of every patient from the
+columnar store and decides all patients in one NumPy pass.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from .store import VITALS
+
+DEFAULT_RULES = Path(__file__).with_name("alert_rules.json")
+
+
+def load_rules(path=None):
+    """Read and validate a rules file (``ALERT_RULES`` or the bundled one)."""
+    path = Path(path or os.getenv("ALERT_RULES") or DEFAULT_RULES)
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    if not rules.get("levels"):
+        raise ValueError(f"{path}: no alert levels defined")
+    names = [level["name"] for level in rules["levels"]]
+    for level in rules["levels"]:
+        if int(level.get("window", 1)) < 1:
+            raise ValueError(f"{path}: level {level['name']} needs window >= 1")
+        for side in ("high", "low"):
+            unknown = set(level.get(side, {})) - set(VITALS)
+            if unknown:
+                raise ValueError(f"{path}: unknown vitals {sorted(unknown)} in {level['name']}")
+    for group in rules.get("age_groups", []):
+        unknown = set(group.get("levels", {})) - set(names)
+        if unknown:
+            raise ValueError(f"{path}: age group {group['name']} overrides unknown levels {sorted(unknown)}")
+    return rules
+
+
+class AlertEngine:
+    """Evaluates alert levels for many patients at once."""
+
+    def __init__(self, rules=None):
+        self.rules = load_rules() if rules is None else rules
+        self.default = self.rules.get("default", "GREEN")
+        levels = self.rules["levels"]
+        groups = self.rules.get("age_groups", [])
+
+        self.names = np.array([lv["name"] for lv in levels] + [self.default], dtype=object)
+        self.windows = np.array([int(lv.get("window", 1)) for lv in levels])
+        self.group_names = [g["name"] for g in groups]
+        self.max_ages = np.array([g.get("max_age", float("inf")) for g in groups], dtype=float)
+
+        # limits[level, group, vital]; the last group is the un-overridden base.
+        # Unused limits are +/-inf so they never breach.
+        shape = (len(levels), len(groups) + 1, len(VITALS))
+        self.high = np.full(shape, np.inf)
+        self.low = np.full(shape, -np.inf)
+        for li, level in enumerate(levels):
+            for gi, group in enumerate(groups + [{}]):
+                override = group.get("levels", {}).get(level["name"], {})
+                for side, limits in (("high", self.high), ("low", self.low)):
+                    merged = {**level.get(side, {}), **override.get(side, {})}
+                    for vi, vital in enumerate(VITALS):
+                        if vital in merged:
+                            limits[li, gi, vi] = merged[vital]
+
+    def group_of(self, ages):
+        """Index of the first age group whose ``max_age`` covers each age.
+
+        Ages past the last group fall into it; NaN ages map to the base limits.
+        """
+        ages = np.asarray(ages, dtype=float)
+        idx = np.searchsorted(self.max_ages, ages, side="left")
+        idx = np.minimum(idx, max(len(self.max_ages) - 1, 0))
+        return np.where(np.isnan(ages), len(self.max_ages), idx)
+
+    def limits(self, level, age):
+        """``{"high": {...}, "low": {...}}`` in effect for one patient."""
+        li = list(self.names).index(level)
+        gi = int(self.group_of([age])[0])
+        return {
+            side: {v: float(arr[li, gi, vi]) for vi, v in enumerate(VITALS) if np.isfinite(arr[li, gi, vi])}
+            for side, arr in (("high", self.high), ("low", self.low))
+        }
+
+    def evaluate(self, store, pids=None, ages=None):
+        """Alert level per patient as ``{pid: level}``.
+
+        ``ages`` is aligned with ``pids`` (default: every patient in the
+        store); without ages the base limits apply.
+        """
+        pids = store.pids if pids is None else list(pids)
+        if not pids:
+            return {}
+        ages = np.full(len(pids), np.nan) if ages is None else np.asarray(ages, dtype=float)
+        return dict(zip(pids, self.evaluate_arrays(store, pids, ages)))
+
+    def evaluate_arrays(self, store, pids, ages):
+        """Level names as an array aligned with ``pids``."""
+        window = int(self.windows.max())
+        cols, valid = store.tail(window, pids)
+        x = np.stack([cols[v] for v in VITALS], axis=-1).astype(float)  # (P, W, V)
+        g = self.group_of(ages)
+
+        # breach[level, patient, sample]
+        hi = self.high[:, g][:, :, None, :]
+        lo = self.low[:, g][:, :, None, :]
+        breach = ((x[None] > hi) | (x[None] < lo)).any(axis=-1)
+
+        # A level fires if its trailing window is full and fully breached.
+        # Counting the breached run at the right edge covers every window at once.
+        run = np.cumprod(breach[:, :, ::-1], axis=-1).sum(axis=-1)
+        run = np.minimum(run, valid[None])
+        fired = (run >= self.windows[:, None]) & (valid[None] >= self.windows[:, None])
+
+        first = np.where(fired.any(axis=0), fired.argmax(axis=0), len(self.windows))
+        return self.names[first]
@@ -0,0 +1,163 @@
+"""Streaming anomaly detection on the vitals (sudden shifts, slow drifts).
+
+The alert rules only fire once a vital has left its range for a whole
+window, so a heart rate jumping from 65 to 105 -- still "normal" -- goes
+unnoticed.  :class:`AnomalyDetector` compares every sample with the
+patient's own recent behaviour instead.  Per patient and vital it keeps a
+handful of running estimates, each updated in O(1) per sample and
+vectorized across the ward, so the cost does not depend on history length:
+
+* a fast EWMA (a few seconds) -- the current value without monitor jitter;
+* a streaming median and MAD (frugal estimators: each sample moves them one
+  small step towards itself), the robust level and spread of the last
+  minutes;
+* a 1-minute and a 15-minute EWMA.
+
+A **shift** is the fast EWMA sitting more than ``shift_z`` robust standard
+deviations (``1.4826 * MAD``, at least a per-vital floor) away from the
+median: an abrupt change that persisted for a few samples, while a single
+artefact spike is damped away.  A **drift** is the 1-minute mean more than
+``drift_z`` of them away from the 15-minute mean: a slow slide that never
+jumps.  The spread is not learned from flagged samples, so a long episode
+cannot teach the detector that it is normal; the levels keep adapting, and
+a new steady state stops being flagged once the baselines caught up.
+
+Flags are kept per sample in a ring of the store (like the NEWS2 scores),
+so the charts can mark where each episode began.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .store import VITALS
+
+SHIFT, DRIFT = 1, 2
+KINDS = {SHIFT: "shift", DRIFT: "drift"}
+
+# Smallest robust standard deviation per vital (monitor resolution plus
+# ordinary beat-to-beat variation), in VITALS order.
+FLOOR = np.array([3.0, 1.0, 4.0, 0.1])
+
+# Median / MAD step per second, as a fraction of the current spread.
+MEDIAN_RATE = 0.05
+MAD_RATE = 0.01
+
+# Time constants (seconds) of the fast, 1-minute and 15-minute averages.
+FAST_S, LEVEL_S, BASE_S = 3.0, 60.0, 900.0
+
+_NV = len(VITALS)
+_SCALE = 1.4826  # MAD -> standard deviation for normal data
+
+
+def _alpha(tau, dt):
+    return 1.0 - np.exp(-dt / tau)
+
+
+class AnomalyDetector:
+    """Shift / drift flags for every sample of a VitalsStore.
+
+    Subscribes to ``store``, which must not hold samples yet.  No flags are
+    raised during the first ``warmup`` samples of a patient.
+    """
+
+    def __init__(self, store, shift_z=5.0, drift_z=4.0, warmup=120):
+        self.store = store
+        self.shift_z = shift_z
+        self.drift_z = drift_z
+        self.warmup = warmup
+        dt = store.sample_interval
+        self._a_fast, self._a_level, self._a_base = (_alpha(s, dt) for s in (FAST_S, LEVEL_S, BASE_S))
+        self._median_step, self._mad_step = MEDIAN_RATE * dt, MAD_RATE * dt
+        self._alloc(max(len(store), 1))
+        # Bit i: shift in VITALS[i]; bit 4 + i: drift in VITALS[i].
+        store.add_ring("anomaly", np.uint8)
+        store.subscribe(self.update)
+
+    def _alloc(self, slots, old=None):
+        state = {
+            "_n": np.zeros(slots, dtype=np.int64),
+            "_fast": np.zeros((slots, _NV)),
+            "_level": np.zeros((slots, _NV)),
+            "_base": np.zeros((slots, _NV)),
+            "_median": np.zeros((slots, _NV)),
+            "_mad": np.tile(FLOOR / _SCALE, (slots, 1)),
+        }
+        if old is not None:
+            for name, arr in state.items():
+                arr[: len(old[name])] = old[name]
+        self.__dict__.update(state)
+        self._names = tuple(state)
+
+    def update(self, slots, times, values):
+        if slots.max() >= len(self._n):
+            self._alloc(max(2 * len(self._n), slots.max() + 1),
+                        {name: getattr(self, name) for name in self._names})
+        x = np.column_stack([np.asarray(values[v], dtype=np.float64) for v in VITALS])
+        first = self._n[slots] == 0
+        if first.any():
+            for name in ("_fast", "_level", "_base", "_median"):
+                getattr(self, name)[slots[first]] = x[first]
+
+        fast = self._fast[slots]
+        fast += self._a_fast * (x - fast)
+        level = self._level[slots]
+        level += self._a_level * (x - level)
+        base = self._base[slots]
+        base += self._a_base * (x - base)
+        median, mad = self._median[slots], self._mad[slots]
+        scale = np.maximum(_SCALE * mad, FLOOR)
+        median += self._median_step * scale * np.sign(x - median)
+
+        warm = (self._n[slots] >= self.warmup)[:, None]
+        shift = warm & (np.abs(fast - median) > self.shift_z * scale)
+        drift = warm & ~shift & (np.abs(level - base) > self.drift_z * scale)
+        calm = ~(shift | drift)
+        mad += calm * self._mad_step * scale * np.sign(np.abs(x - median) - mad)
+
+        self._fast[slots], self._level[slots], self._base[slots] = fast, level, base
+        self._median[slots], self._mad[slots] = median, mad
+        bits = 1 << np.arange(_NV)
+        self.store.put_ring(slots, anomaly=(shift @ bits + drift @ (bits << _NV)).astype(np.uint8))
+        self._n[slots] += 1
+
+    def window(self, pid, n=None):
+        """Oldest-first flag masks of the last ``n`` samples of ``pid``."""
+        return self.store.ring_window("anomaly", pid, n)
+
+    def kinds(self, mask, vital):
+        """0 / SHIFT / DRIFT per mask for ``vital``."""
+        i = VITALS.index(vital)
+        mask = np.asarray(mask)
+        return np.where(mask & (1 << i), SHIFT, np.where(mask & (1 << (_NV + i)), DRIFT, 0))
+
+    def events(self, pid, n=None, limit=50):
+        """Start of every anomaly episode in the last ``n`` samples of ``pid``.
+
+        DataFrame with ``time``, ``vital``, ``kind`` ("shift" / "drift") and
+        the sample ``value``, oldest first; at most the ``limit`` most recent
+        episodes per vital.
+        """
+        mask = self.window(pid, n)
+        window = self.store.window(pid, len(mask))
+        index, vital, kind, value = [], [], [], []
+        for v in VITALS:
+            k = self.kinds(mask, v)
+            start = np.flatnonzero((k != 0) & (k != np.append(0, k[:-1])))[-limit:]
+            index.append(start)
+            vital += [v] * len(start)
+            kind.append(k[start])
+            value.append(window[v][start].astype(float))
+        index, kind, value = (np.concatenate(a) for a in (index, kind, value))
+        order = np.argsort(index, kind="stable")
+        return pd.DataFrame({
+            "time": window["time"][index[order]],
+            "vital": np.array(vital, dtype=object)[order],
+            "kind": np.array([None, KINDS[SHIFT], KINDS[DRIFT]], dtype=object)[kind[order]],
+            "value": value[order],
+        })
+
+    def latest(self, pids):
+        """``{vital: kind array}`` of the newest sample of each of ``pids`` (0 = none)."""
+        slots = np.fromiter((self.store.slot(p) for p in pids), dtype=np.intp, count=len(pids))
+        mask = self.store.ring_latest(slots, "anomaly")[0]["anomaly"]
+        return {v: self.kinds(mask, v) for v in VITALS}
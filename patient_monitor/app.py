@@ -0,0 +1,511 @@
+"""Streamlit render layer shared by every dashboard entry point.
+
+Streamlit re-executes the entry script top to bottom on every rerun, but
+imported modules only once per process.  Everything that is not drawing --
+settings, the cached registry / alert engine / AI clients, the page logic --
+therefore lives here, and ``Medical_Gemini/dashboard.py`` and
+``Medical_project/dashboard.py`` (and their ``_dashboard.py`` twins) are
+three-line scripts calling :func:`run` with their variant's texts.
+
+There is no full-page autorefresh.  The live parts of a page are
+``st.fragment``\ s that rerun on their own every ``refresh_ms``; what they
+draw is derived once per data version (``PatientRegistry.version``) and
+shared by every session through ``st.cache_resource``, so a tick with no new
+samples only re-sends cached payloads and the rest of the page (sidebar, AI
+panel, history) is not rerun at all.  The registry itself is kept current
+by a background follower thread, not by reruns.
+
+The data path itself (store, rollups, alerts, charts, ...) stays free of
+Streamlit in the sibling modules, so it can be tested and benchmarked alone.
+"""
+
+import os
+import time
+
+import pandas as pd
+import streamlit as st
+
+from .alerts import AlertEngine
+from .assistant import AIJob, AIWorker
+from .anomaly import KINDS
+from .charts import annotate, annotated_spec, chart_frames, line_spec, news_frame, range_frames, with_forecast
+from .context import CONTEXT_TTL, build_prompt, cache_namespace, summarize
+from .ingest import start_in_thread
+from .llm import LLMClient
+from .perf import PerfTracker
+from .registry import PatientRegistry
+from .response_cache import ResponseCache
+from .shards import AlertPool, AlertResults
+from .store import VITALS
+from .vitals_db import MAX_PID_BYTES, VitalsDB, now_ns
+from .vitals_log import VitalsLog
+from .ward import ward_snapshot
+
+# ---------------- SETTINGS ----------------
+RETENTION_HOURS = float(os.getenv("VITALS_RETENTION_HOURS", "1"))
+SAMPLE_HZ = float(os.getenv("VITALS_HZ", "1"))
+INGEST_MODE = os.getenv("VITALS_INGEST", "embedded")
+# Shared-memory segment carrying vitals from the ingestion service (empty: database only).
+SHM_NAME = os.getenv("VITALS_SHM", "")
+# Alert worker processes for the ward overview (needs VITALS_SHM; 0: evaluate in the page).
+ALERT_WORKERS = int(os.getenv("VITALS_ALERT_WORKERS", "0"))
+# Token budget of the patient summary sent along with every AI question.
+AI_CONTEXT_TOKENS = int(os.getenv("AI_CONTEXT_TOKENS", "160"))
+
+# Texts and layout of each dashboard; ``run`` fills gaps from GEMINI.
+GEMINI = {
+    "page": {"page_title": "Smart Patient Monitoring", "layout": "wide", "initial_sidebar_state": "expanded"},
+    "refresh_ms": 2500,
+    "sidebar_title": "🧑‍⚕️ Patient Control",
+    "mode_label": "Mode",
+    "modes": ("➕ New Patient", "📂 Existing Patient", "🏥 Ward Overview"),
+    "default_age": 30,
+    "added": "✅ Patient Added",
+    "duplicate": "❌ Invalid / Duplicate ID",
+    "no_patients": "No patients available",
+    "empty": "👈 Sidebar se patient add / select karo",
+    "title": "🏥 Patient Dashboard — {name}",
+    "columns": (3.5, 1.5),
+    "status": {"GREEN": "🟢 Patient Stable", "YELLOW": "🟡 Needs Observation", "RED": "🔴 Critical Condition"},
+    "metrics": True,
+    "charts_heading": "### 📊 Live Vitals (Raw Data)",
+    "chart_labels": None,
+    "minute_heading": "### ⏱️ Per-Minute Average Vitals (Table)",
+    "minute_rows": 10,
+    "guidance_heading": "### 🚑 Caregiver Guidance",
+    "guidance": {
+        "RED": "Immediate doctor call. Oxygen & airway ensure karo.",
+        "YELLOW": "Close monitoring & recheck vitals.",
+        "GREEN": "No action needed.",
+    },
+    "ai_heading": "## 🤖 AI Assistant",
+    "ai_caption": None,
+    "ai_label": "Ask medical query",
+    "ai_placeholder": "Eg: SpO2 88 ho toh kya kare?",
+    "ai_height": 120,
+    "ai_empty": "Question likho",
+    "ai_pending": "AI soch raha hai...",
+    "ai_response_heading": "### 🧠 AI Response",
+    "ai_footer": None,
+    # LLMClient / AIWorker settings and the cache namespace of the answers.
+    "openrouter_model": None,
+    "ai_fallback": None,
+    "ai_kwargs": {},
+    "cache_namespace": "",
+    # Send the selected patient's vitals along with each question.
+    "ai_context": True,
+}
+
+PROJECT = {
+    "page": {"page_title": "Smart Patient Monitoring", "layout": "wide"},
+    "refresh_ms": 1000,
+    "sidebar_title": "🧑‍⚕️ Patient Section",
+    "mode_label": "Choose:",
+    "modes": ("New Patient", "Existing Patient", "Ward Overview"),
+    "default_age": 25,
+    "added": "Patient Added",
+    "duplicate": "Patient ID exists",
+    "no_patients": "No patients found",
+    "empty": "👈 Please add or select a patient",
+    "title": "🏥 Dashboard - {name}",
+    "columns": (3, 1),
+    "status": {"GREEN": "🟢 Patient Stable", "YELLOW": "🟡 Minor Fluctuation", "RED": "🔴 CRITICAL CONDITION"},
+    "metrics": False,
+    "charts_heading": "### 📊 Live Vitals (2 Graphs per Row)",
+    "chart_labels": {"HR": "Heart Rate (BPM)", "SpO2": "SpO₂ (%)", "BP": "Blood Pressure", "Temp": "Temperature (°C)"},
+    "minute_heading": "### ⏱ Per-Minute Average",
+    "minute_rows": 1,
+    "guidance_heading": "## 🚑 AI Caregiver Guidance",
+    "guidance": {
+        "RED": "• Keep patient upright  \n• Clear airway  \n• Loosen tight clothing  \n• Call doctor immediately",
+        "YELLOW": "• Observe patient closely  \n• Recheck vitals",
+        "GREEN": "Patient stable, no action required",
+    },
+    "ai_heading": "## 🤖 AI Chat Assistant",
+    "ai_caption": "Internet-based medical & system queries",
+    "ai_label": "Ask AI",
+    "ai_placeholder": "Eg: BP high hone par kya kare?",
+    "ai_height": 140,
+    "ai_empty": "Please enter a query first.",
+    "ai_pending": "Fetching response from AI...",
+    "ai_response_heading": None,
+    "ai_footer": "This AI is independent from vitals monitoring AI",
+    "openrouter_model": "meta-llama/llama-3.2-3b-instruct:free",
+    "ai_fallback": "AI API failed or quota exceeded. Follow standard protocol.",
+    # Answers here come without the Hinglish system prompt; keep them apart.
+    "ai_kwargs": {"system": None, "temperature": 0.7},
+    "cache_namespace": "plain",
+    "ai_context": False,  # see ai_footer
+}
+
+VARIANTS = {"gemini": GEMINI, "project": PROJECT}
+
+# Zoom ranges of the history charts (seconds), answered from the rollup pyramid.
+_RANGES = {"5 min": 300, "1 ghanta": 3600, "Shift (8 h)": 8 * 3600, "24 h": 24 * 3600}
+_ANOMALY_TEXT = {"shift": "achanak badlav", "drift": "dheere dheere badlav"}
+_LEVEL_BOX = {"GREEN": st.success, "YELLOW": st.warning, "RED": st.error}
+_SPECS = {v: annotated_spec(v) for v in VITALS}
+# Scores change in whole points: draw them as steps from zero.
+_SPECS["NEWS"] = line_spec("NEWS")
+_SPECS["NEWS"]["mark"]["interpolate"] = "step-after"
+_SPECS["NEWS"]["encoding"]["y"]["scale"] = {"zero": True}
+
+
+# ---------------- SHARED STATE ----------------
+@st.cache_resource
+def get_registry():
+    # One registry per server process, shared by every browser session.
+    # "embedded" runs the ingestion loop on a server thread; set
+    # VITALS_INGEST=external when `python -m patient_monitor.ingest` runs instead.
+    if INGEST_MODE == "embedded":
+        start_in_thread(VitalsDB(), hz=SAMPLE_HZ, keep_hours=RETENTION_HOURS, log=get_vitals_log(),
+                        shm=SHM_NAME or None)
+    registry = PatientRegistry(VitalsDB(), retention_hours=RETENTION_HOURS, sample_interval=1 / SAMPLE_HZ,
+                               shm=SHM_NAME or None, alert_engine=get_alert_engine())
+    registry.follow(interval=min(0.5, 1 / SAMPLE_HZ))
+    return registry
+
+
+@st.cache_resource
+def get_vitals_log():
+    # Durable per-day history written by the ingestion service, read via memmap.
+    return VitalsLog()
+
+
+@st.cache_resource
+def get_alert_engine():
+    return AlertEngine()
+
+
+@st.cache_resource
+def get_alert_results():
+    # Sharded alert workers reading the shared-memory segment; None when disabled.
+    if not (SHM_NAME and ALERT_WORKERS):
+        return None
+    pool = AlertPool(SHM_NAME, workers=ALERT_WORKERS)
+    pool.follow()
+    return AlertResults(SHM_NAME, get_alert_engine())
+
+
+@st.cache_resource
+def get_ai_worker(fallback=None):
+    return AIWorker(fallback=fallback and {"busy": fallback, "unavailable": fallback})
+
+
+@st.cache_resource
+def get_llm_client(openrouter_model=None):
+    # OpenRouter first, Gemini as failover (whichever keys are in .env).
+    return LLMClient.from_env(order=("openrouter", "gemini"), openrouter_model=openrouter_model)
+
+
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+
+@st.cache_resource
+def get_perf():
+    # Off unless PERF_TIMING=1 or someone opens the Performance panel.
+    return PerfTracker()
+
+
+# ---------------- VIEWS (one per data version, shared by all sessions) ----------------
+@st.cache_resource(max_entries=256, show_spinner=False)
+def patient_view(_registry, pid, version, minute_rows):
+    """Everything the live patient panel draws, for one data version."""
+    if not version:
+        return None
+    registry, store = _registry, _registry.store
+    with get_perf().span("data"), registry.reading():
+        age = registry.get(pid)["age"]
+        score, risk, _ = registry.news.latest([pid])
+        frames = {v: f.reset_index() for v, f in chart_frames(store, registry.rollup, pid).items()}
+        return {
+            "alert": get_alert_engine().evaluate(store, [pid], [age])[pid],
+            "latest": store.latest(pid),
+            "news": (int(score[0]), risk[0]),
+            "charts": with_forecast(annotate(frames, registry.anomaly.events(pid)), registry.forecast.project(pid)),
+            "forecast": tuple(a[0] for a in registry.forecast.status([pid])),
+            "anomalies": {v: KINDS[k[0]] for v, k in registry.anomaly.latest([pid]).items() if k[0]},
+            "news_chart": news_frame(store, registry.news, pid).reset_index(),
+            "minutes": registry.rollup.table(pid, "1min", n=minute_rows),
+        }
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def context_view(_registry, pid, version):
+    """Patient summary attached to AI questions, for one data version."""
+    if not version:
+        return None
+    with get_perf().span("ai_context"):
+        return summarize(_registry, get_alert_engine(), pid)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def ward_view(_registry, version, results_stamp=None):
+    with get_perf().span("ward_snapshot"):
+        return ward_snapshot(_registry, get_alert_engine(), results=get_alert_results())
+
+
+# ---------------- PAGE ----------------
+def run(variant="gemini"):
+    """Render one rerun of the dashboard ``variant`` ("gemini" or "project")."""
+    cfg = {**GEMINI, **VARIANTS[variant]}
+    st.set_page_config(**cfg["page"])
+
+    perf = get_perf()
+    started = time.perf_counter()
+    registry = get_registry()
+
+    for key, default in (("current_patient", None), ("ai_response", ""), ("ai_job", None)):
+        if key not in st.session_state:
+            st.session_state[key] = default
+
+    mode, show_perf = sidebar(cfg, registry, perf)
+    if mode == cfg["modes"][2]:
+        ward_page(cfg, registry, perf)
+    elif st.session_state.current_patient:
+        patient_page(cfg, registry, perf, st.session_state.current_patient)
+    else:
+        st.info(cfg["empty"])
+
+    if perf.enabled:
+        perf.record("rerun", (time.perf_counter() - started) * 1e3)
+    if show_perf:
+        perf_panel(cfg, perf)
+
+
+def sidebar(cfg, registry, perf):
+    """Patient add / select controls; returns ``(mode, show_perf)``."""
+    st.sidebar.title(cfg["sidebar_title"])
+    mode = st.sidebar.radio(cfg["mode_label"], cfg["modes"])
+
+    # The one switch for the shared tracker: the box shows whether timing is
+    # on (in any session) and ticking / unticking it turns timing on / off.
+    st.session_state.perf_panel = perf.enabled
+    show_perf = st.sidebar.checkbox("⏱️ Performance panel", key="perf_panel", on_change=_toggle_timing)
+
+    if mode == cfg["modes"][0]:
+        pid = st.sidebar.text_input("Patient ID")
+        name = st.sidebar.text_input("Name")
+        age = st.sidebar.number_input("Age", 0, 120, cfg["default_age"])
+        gender = st.sidebar.selectbox("Gender", ["Male", "Female", "Other"])
+
+        if st.sidebar.button("Add Patient"):
+            try:
+                added = registry.add_patient(pid, name, age, gender)
+            except ValueError:
+                st.sidebar.error(f"Patient ID bahut lamba hai (max {MAX_PID_BYTES} bytes)")
+            else:
+                if added:
+                    st.session_state.current_patient = pid
+                    st.sidebar.success(cfg["added"])
+                else:
+                    st.sidebar.error(cfg["duplicate"])
+
+    elif mode == cfg["modes"][1]:
+        patients = registry.patients()
+        if patients:
+            pid = st.sidebar.selectbox("Select Patient", list(patients))
+            if st.sidebar.button("Load Patient"):
+                st.session_state.current_patient = pid
+        else:
+            st.sidebar.info(cfg["no_patients"])
+    return mode, show_perf
+
+
+def ward_page(cfg, registry, perf):
+    st.title("🏥 Ward Overview")
+    st.fragment(_live_ward, run_every=cfg["refresh_ms"] / 1000)(registry, perf)
+
+
+def _live_ward(registry, perf):
+    # One batched pass over every patient, recomputed only when the ward changed.
+    results = get_alert_results()
+    ward = ward_view(registry, registry.version(), results and results.stamp())
+    if ward.empty:
+        st.info("⏳ Koi patient nahi / vitals ka intezaar...")
+        return
+
+    status = ward["Status"].str.split().str[-1].value_counts()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("🔴 Critical", int(status.get("RED", 0)))
+    c2.metric("🔮 Predicted RED", int((ward["Forecast"] != "").sum()))
+    c3.metric("🟡 Observation", int(status.get("YELLOW", 0)))
+    c4.metric("🟢 Stable", int(status.get("GREEN", 0)))
+
+    with perf.span("ward_render"):
+        st.dataframe(
+            ward,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Age": st.column_config.NumberColumn(format="%d"),
+                "NEWS": st.column_config.NumberColumn("NEWS2", format="%d"),
+                "HR": st.column_config.NumberColumn("❤️ HR", format="%d"),
+                "SpO2": st.column_config.NumberColumn("🫁 SpO₂", format="%d"),
+                "BP": st.column_config.NumberColumn("🩸 BP", format="%d"),
+                "Temp": st.column_config.NumberColumn("🌡 Temp", format="%.1f"),
+                "HR trend": st.column_config.LineChartColumn("HR trend"),
+            }
+        )
+
+
+def patient_page(cfg, registry, perf, pid):
+    patient = registry.get(pid)
+    store = registry.store
+
+    st.title(cfg["title"].format(name=patient["name"]))
+    st.caption(f"Age: {patient['age']} | Gender: {patient['gender']}")
+
+    left, right = st.columns(list(cfg["columns"]))
+    with left:
+        st.fragment(_live_patient, run_every=cfg["refresh_ms"] / 1000)(cfg, registry, perf, pid)
+
+        with st.expander("🗂️ History"):
+            span = st.radio("Range", list(_RANGES), index=2, horizontal=True)
+            history = None
+            with perf.span("history"), registry.reading():
+                if store.total(pid):
+                    history, level = range_frames(store, registry.rollup, pid, now_ns() - int(_RANGES[span] * 1e9),
+                                                  log=get_vitals_log())
+            if history is None or history["HR"].empty:
+                st.info("Abhi tak koi history nahi")
+            else:
+                st.caption(f"Resolution: {level} ({len(history['HR'])} points)")
+                _chart_grid(history, cfg["chart_labels"])
+
+    with right:
+        # Polls only while an answer is streaming in.
+        job = st.session_state.ai_job
+        polling = job is not None and not job.done
+        st.fragment(ai_panel, run_every=0.5 if polling else None)(cfg, perf, polling, registry, pid)
+
+
+def _live_patient(cfg, registry, perf, pid):
+    # Vitals are written by the ingestion service.
+    view = patient_view(registry, pid, registry.version(pid), cfg["minute_rows"])
+    if view is None:
+        st.info("⏳ Vitals ka intezaar... (ingestion service chal raha hai?)")
+        return
+    alert, latest, charts, minutes = view["alert"], view["latest"], view["charts"], view["minutes"]
+
+    _LEVEL_BOX[alert](cfg["status"][alert])
+    predicted, eta, vital = view["forecast"]
+    if predicted and alert != "RED":
+        st.error(f"🔮 Predicted RED: {vital} ka trend ~{max(eta / 60, 1):.0f} min mein RED limit paar kar sakta hai")
+    score, risk = view["news"]
+    st.caption(f"NEWS2 score: **{score}** ({risk} risk)")
+    if view["anomalies"]:
+        st.warning("⚠️ " + ", ".join(f"{v}: {_ANOMALY_TEXT[kind]} ({kind})" for v, kind in view["anomalies"].items()))
+
+    if cfg["metrics"]:
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("❤️ Heart Rate", f"{latest['HR']} bpm")
+        m2.metric("🫁 SpO₂", f"{latest['SpO2']} %")
+        m3.metric("🩸 BP", f"{latest['BP']} mmHg")
+        m4.metric("🌡 Temp", f"{latest['Temp']} °C")
+
+    st.markdown(cfg["charts_heading"])
+    with perf.span("charts"):
+        _chart_grid(charts, cfg["chart_labels"])
+        st.markdown("**📈 NEWS2 early-warning score**")
+        st.vega_lite_chart(view["news_chart"], _SPECS["NEWS"], use_container_width=True)
+
+    st.markdown(cfg["minute_heading"])
+    with perf.span("table"):
+        if cfg["minute_rows"] == 1:
+            st.write(minutes[list(VITALS)].iloc[-1])
+        else:
+            st.dataframe(minutes.rename(columns={"start": "minute"}), use_container_width=True)
+
+    st.markdown(cfg["guidance_heading"])
+    _LEVEL_BOX[alert](cfg["guidance"][alert])
+
+
+def _chart_grid(frames, labels=None):
+    """The four vitals (frames with a ``time`` column) as a 2 × 2 grid."""
+    for row in (VITALS[:2], VITALS[2:]):
+        for col, vital in zip(st.columns(2), row):
+            with col:
+                if labels:
+                    st.markdown(f"**{labels[vital]}**")
+                st.vega_lite_chart(frames[vital], _SPECS[vital], use_container_width=True)
+
+
+def ai_panel(cfg, perf, polling=False, registry=None, pid=None):
+    st.markdown(cfg["ai_heading"])
+    if cfg["ai_caption"]:
+        st.caption(cfg["ai_caption"])
+
+    query = st.text_area(cfg["ai_label"], placeholder=cfg["ai_placeholder"], height=cfg["ai_height"])
+
+    # The selected patient's vitals go along with the question.
+    summary = context_view(registry, pid, registry.version(pid)) if pid and cfg["ai_context"] else None
+    if summary is not None:
+        st.caption(f"📎 {pid} ke vitals saath bheje jayenge ({summary['level']})")
+
+    if st.button("Ask AI"):
+        llm = get_llm_client(cfg["openrouter_model"])
+        namespace = cache_namespace(cfg["cache_namespace"], pid, summary)
+        ttl = CONTEXT_TTL if summary is not None else None
+        if not llm:
+            st.error("API key missing")
+        elif not query.strip():
+            st.warning(cfg["ai_empty"])
+        else:
+            cache = get_response_cache()
+            with perf.span("ai_cache"):
+                cached = cache.get(query, namespace=namespace)
+            if cached:
+                st.session_state.ai_job = AIJob.completed(query, cached)
+            else:
+                # Runs on a worker thread; rerun the page so this panel starts polling.
+                prompt = build_prompt(query, summary, AI_CONTEXT_TOKENS)
+                st.session_state.ai_job = get_ai_worker(cfg["ai_fallback"]).submit(
+                    llm.stream, prompt,
+                    on_success=lambda job: cache.put(query, job.text, namespace=namespace, ttl=ttl),
+                    **cfg["ai_kwargs"]
+                )
+                st.rerun()
+
+    job = st.session_state.ai_job
+    if job is not None:
+        st.session_state.ai_response = job.text
+        if not job.done:
+            st.caption(cfg["ai_pending"])
+        elif job.cached:
+            st.caption("⚡ Cached answer")
+
+    if st.session_state.ai_response:
+        if cfg["ai_response_heading"]:
+            st.markdown(cfg["ai_response_heading"])
+        st.write(st.session_state.ai_response)
+
+    if cfg["ai_footer"]:
+        st.markdown("---")
+        st.caption(cfg["ai_footer"])
+
+    if polling and job.done:
+        st.rerun()  # re-register the panel without polling
+
+
+def _toggle_timing():
+    perf = get_perf()
+    perf.enabled = st.session_state.perf_panel
+    if not perf.enabled:
+        perf.reset()
+
+
+def perf_panel(cfg, perf):
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        st.caption("Rolling timings per stage (ms), all sessions")
+        stats = perf.stats()
+        if stats:
+            st.dataframe(pd.DataFrame.from_dict(stats, orient="index"), use_container_width=True)
+        llm_stats = get_llm_client(cfg["openrouter_model"]).stats()
+        if llm_stats:
+            st.caption("AI providers")
+            st.dataframe(pd.DataFrame.from_dict(llm_stats, orient="index"), use_container_width=True)
+        st.download_button("⬇️ Prometheus", perf.prometheus(), "dashboard_metrics.prom", "text/plain")
+        st.download_button("⬇️ JSON lines", perf.json_lines(), "dashboard_metrics.jsonl", "application/jsonl")
@@ -0,0 +1,87 @@
+"""Background, streaming AI assistant calls.
+
+The dashboards used to block the whole rerun (and pause the autorefresh) on a
+``requests.post`` to the LLM.  Queries now run on a small thread pool: the
+worker streams tokens into an :class:`AIJob`, and every rerun just copies the
+text received so far into the page, so the vitals keep updating meanwhile.
+The streaming itself comes from :class:`~patient_monitor.llm.LLMClient`.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .llm import AIError
+
+
+class AIJob:
+    """Answer being streamed by a worker thread; safe to read from reruns."""
+
+    def __init__(self, query):
+        self.query = query
+        self.error = None
+        self.cached = False
+        self._chunks = []
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def completed(cls, query, text, cached=True):
+        """A finished job for an answer that needed no upstream call."""
+        job = cls(query)
+        job._chunks.append(text)
+        job.cached = cached
+        job._done.set()
+        return job
+
+    @property
+    def text(self):
+        with self._lock:
+            return "".join(self._chunks)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _run(self, stream, fallback, on_success=None):
+        try:
+            for chunk in stream:
+                with self._lock:
+                    self._chunks.append(chunk)
+            if on_success is not None:
+                on_success(self)
+        except AIError as e:
+            self.error = str(e)
+            self._fallback(fallback["busy"])
+        except Exception as e:
+            self.error = str(e)
+            self._fallback(fallback["unavailable"])
+        finally:
+            self._done.set()
+
+    def _fallback(self, message):
+        with self._lock:
+            if not self._chunks:
+                self._chunks.append(message)
+
+
+class AIWorker:
+    """Thread pool that runs streaming AI queries off the render thread."""
+
+    FALLBACK = {"busy": "AI busy / quota issue.", "unavailable": "AI service unavailable."}
+
+    def __init__(self, max_workers=4, fallback=None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai")
+        self.fallback = {**self.FALLBACK, **(fallback or {})}
+
+    def submit(self, stream_fn, query, on_success=None, **kwargs):
+        """Start ``stream_fn(query, **kwargs)`` (e.g. ``LLMClient.stream``) and return its job.
+
+        ``on_success(job)`` runs on the worker once the full answer has
+        arrived, e.g. to store it in a response cache.
+        """
+        job = AIJob(query)
+        self._pool.submit(job._run, stream_fn(query, **kwargs), self.fallback, on_success)
+        return job
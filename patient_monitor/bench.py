@@ -0,0 +1,205 @@
+"""Benchmarks for the dashboards' data path.
+
+Runs headless (no Streamlit server, no network) over a grid of ward sizes
+and retention lengths, times every step a dashboard rerun goes through and
+stores the results as JSON, one file per commit::
+
+    python -m patient_monitor.bench                  # full grid, compare with the previous run
+    python -m patient_monitor.bench --quick          # retention up to 10k samples
+    python -m patient_monitor.bench --only alerts chart_frames --fail-on-regression
+
+Each case is timed like ``timeit``: repeated until ``--min-time`` seconds
+have passed, reporting the median and the best call.  Runs are compared
+on the best call (the least noisy figure); a case more than ``--threshold``
+slower than in the compared run is flagged as a regression.  Results are
+machine-specific, so the results directory is not versioned.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .alerts import AlertEngine
+from .charts import chart_frames, range_frames
+from .registry import PatientRegistry
+from .simulator import WardSimulator
+from .store import VITALS
+from .vitals_db import now_ns
+from .ward import ward_snapshot
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS = Path(os.getenv("BENCH_RESULTS") or ROOT / "bench_results")
+
+PATIENTS = (1, 50, 500)
+RETENTION = (300, 10_000, 100_000)
+
+# Cases larger than this many retained samples in total are skipped (memory).
+MAX_SAMPLES = 10_000_000
+
+
+def measure(fn, min_time=0.2, min_reps=5):
+    """Per-call ``{"median_us", "min_us", "reps"}`` of ``fn()``."""
+    times = []
+    deadline = time.perf_counter() + min_time
+    while len(times) < min_reps or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    times = np.array(times) * 1e6
+    return {"median_us": round(float(np.median(times)), 2), "min_us": round(float(times.min()), 2),
+            "reps": len(times)}
+
+
+def build_ward(patients, retention, seed=0):
+    """Registry with ``patients`` patients and a full ring of ``retention`` samples."""
+    sim = WardSimulator(seed=seed, deteriorate=0.1, horizon=retention)
+    pids = [f"B{i:04d}" for i in range(patients)]
+    ages = sim.add(pids)
+    registry = PatientRegistry(None, retention_hours=retention / 3600, sample_interval=1.0)
+    for pid, age in zip(pids, ages):
+        registry.add_patient(pid, pid, int(age), "")
+    t0 = now_ns() - retention * 10**9
+    for k in range(retention):
+        registry.append_batch(pids, np.datetime64(t0 + k * 10**9, "ns"), **sim.step())
+    return registry, sim, pids, ages
+
+
+def cases(registry, sim, pids, ages):
+    """``{name: callable}`` for one ward, in the order a rerun uses them."""
+    store, rollup, engine = registry.store, registry.rollup, AlertEngine()
+    pid = pids[0]
+    clock = [int(store.window(pid, 1)["time"][0].view(np.int64))]
+    tick = sim.step()
+    one = {v: tick[v][0] for v in VITALS}
+
+    def append_tick():
+        clock[0] += 10**9
+        registry.append_batch(pids, np.datetime64(clock[0], "ns"), **tick)
+
+    def append_one():
+        clock[0] += 10**9
+        registry.append(pid, np.datetime64(clock[0], "ns"), **one)
+
+    return {
+        "append_tick": append_tick,
+        "append_one": append_one,
+        "alerts": lambda: engine.evaluate_arrays(store, pids, ages),
+        "news_latest": lambda: registry.news.latest(pids),
+        "anomaly_events": lambda: registry.anomaly.events(pid),
+        "forecast_status": lambda: registry.forecast.status(pids),
+        "frame": lambda: store.frame(pid),
+        "minute_table": lambda: rollup.table(pid, "1min", n=10),
+        "chart_frames": lambda: chart_frames(store, rollup, pid),
+        "zoom_5min": lambda: range_frames(store, rollup, pid, clock[0] - 300 * 10**9),
+        "zoom_24h": lambda: range_frames(store, rollup, pid, clock[0] - 86_400 * 10**9),
+        "ward_snapshot": lambda: ward_snapshot(registry, engine),
+    }
+
+
+def run(patients=PATIENTS, retention=RETENTION, only=None, min_time=0.2, max_samples=MAX_SAMPLES):
+    results = {}
+    for n_ret in retention:
+        for n_pat in patients:
+            label = f"p{n_pat}-r{n_ret}"
+            if n_pat * n_ret > max_samples:
+                print(f"{label:<14} skipped ({n_pat * n_ret:,} samples > --max-samples)")
+                continue
+            started = time.perf_counter()
+            ward = build_ward(n_pat, n_ret)
+            print(f"{label:<14} built in {time.perf_counter() - started:.1f} s")
+            for name, fn in cases(*ward).items():
+                if only and name not in only:
+                    continue
+                results[f"{name}[{label}]"] = stats = measure(fn, min_time)
+                print(f"  {name:<14} {stats['median_us']:>12,.1f} µs  (min {stats['min_us']:,.1f})")
+    return results
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata():
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.platform(),
+    }
+
+
+def compare(results, previous, threshold):
+    """Print the change against ``previous``; returns the regressed case names."""
+    regressed = []
+    for name, stats in results.items():
+        old = previous.get(name)
+        if not old:
+            continue
+        change = stats["min_us"] / old["min_us"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  ⚠ regression"
+            regressed.append(name)
+        elif change < -threshold:
+            flag = "  ✓ faster"
+        print(f"{name:<36} {old['min_us']:>12,.1f} → {stats['min_us']:>12,.1f} µs  {change:+.0%}{flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard data path")
+    parser.add_argument("--patients", type=int, nargs="+", default=PATIENTS)
+    parser.add_argument("--retention", type=int, nargs="+", default=RETENTION, help="samples per patient")
+    parser.add_argument("--quick", action="store_true", help="retention up to 10k samples only")
+    parser.add_argument("--only", nargs="+", help="run only these cases")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent timing each case")
+    parser.add_argument("--max-samples", type=int, default=MAX_SAMPLES)
+    parser.add_argument("--results", default=str(RESULTS), help="directory of stored runs")
+    parser.add_argument("--compare", help="result file to compare with (default: the latest stored run)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown counted as a regression")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    retention = [r for r in args.retention if not args.quick or r <= 10_000]
+    results = run(args.patients, retention, args.only, args.min_time, args.max_samples)
+
+    out_dir = Path(args.results)
+    previous = Path(args.compare) if args.compare else None
+    if previous is None and out_dir.is_dir():
+        stored = sorted(out_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        previous = stored[-1] if stored else None
+
+    regressed = []
+    if previous is not None and previous.exists():
+        print(f"\ncompared with {previous.name}:")
+        regressed = compare(results, json.loads(previous.read_text())["results"], args.threshold)
+
+    if not args.no_save:
+        meta = metadata()
+        out_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{meta['date'].replace(':', '')}_{meta['commit'] or 'nogit'}{'-dirty' if meta['dirty'] else ''}.json"
+        (out_dir / name).write_text(json.dumps({"meta": meta, "results": results}, indent=1))
+        print(f"\nsaved {out_dir / name}")
+
+    if regressed and args.fail_on_regression:
+        raise SystemExit(f"{len(regressed)} regression(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Chart-data preparation with a fixed point budget per chart.
+
+``st.line_chart(df, y=...)`` used to ship the whole raw frame (every column,
+every sample) to the browser on each refresh.  :func:`chart_frames` sends one
+column per chart and at most ``budget`` points:
+
+* short windows go out raw;
+* longer ones are downsampled with Largest-Triangle-Three-Buckets, which
+  keeps spikes and dips that plain striding would drop;
+* past ``raw_factor * budget`` samples the chart switches to the 1-minute
+  rollup means (LTTB-downsampled again if there are still too many).
+
+So the payload per rerun stays flat as retention grows.  :func:`range_frames`
+does the same for any zoom range through the rollup pyramid.  Anomaly episodes
+(:mod:`.anomaly`) and the trend forecast (:mod:`.forecast`) are added to the
+frames as a few extra rows by :func:`annotate` / :func:`with_forecast` and
+drawn over the line by :func:`annotated_spec`.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .store import VITALS
+
+BUDGET = 300
+RAW_FACTOR = 10
+
+
+def lttb(x, y, n_out):
+    """Indices of the ``n_out`` points LTTB keeps from ``(x, y)``.
+
+    First and last points are always kept; every bucket in between keeps the
+    point forming the largest triangle with the previous pick and the
+    average of the next bucket.  ``y`` may be 2-D (series × samples) to
+    downsample several series sharing ``x`` in one pass; the result then has
+    one row of indices per series.
+    """
+    y = np.asarray(y, dtype=float)
+    flat = y.ndim == 1
+    y = np.atleast_2d(y)
+    k, n = y.shape
+    if n_out >= n:
+        keep = np.tile(np.arange(n), (k, 1))
+    elif n_out < 3:
+        keep = np.tile(np.array([0, n - 1])[:n_out], (k, 1))
+    else:
+        x = np.asarray(x, dtype=float)
+        edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+        # Averages of every bucket (plus the last point as a final bucket).
+        starts = np.append(edges[:-1], n - 1)
+        sizes = np.diff(np.append(starts, n))
+        cx = np.add.reduceat(x, starts) / sizes
+        cy = np.add.reduceat(y, starts, axis=1) / sizes
+        rows = np.arange(k)
+        keep = np.empty((k, n_out), dtype=np.intp)
+        keep[:, 0], keep[:, -1] = 0, n - 1
+        a = np.zeros(k, dtype=np.intp)
+        for i in range(n_out - 2):
+            lo, hi = edges[i], edges[i + 1]
+            xa, ya = x[a][:, None], y[rows, a][:, None]
+            area = np.abs((xa - cx[i + 1]) * (y[:, lo:hi] - ya)
+                          - (xa - x[lo:hi]) * (cy[:, i + 1:i + 2] - ya))
+            a = lo + area.argmax(axis=1)
+            keep[:, i + 1] = a
+    return keep[0] if flat else keep
+
+
+def chart_frames(store, rollup, pid, vitals=VITALS, budget=BUDGET, raw_factor=RAW_FACTOR):
+    """``{vital: DataFrame}`` indexed by time, one column each, ≤ ``budget`` rows.
+
+    Call it while holding the registry lock; the results are small copies.
+    """
+    n = store.size(pid)
+    if n > raw_factor * budget:
+        minutes = int(np.ceil(n * store.sample_interval / 60)) + 1
+        agg = rollup.table(pid, "1min", n=minutes)
+        t = agg["start"].to_numpy()
+        series = {v: agg[v].to_numpy() for v in vitals}
+    else:
+        window = store.window(pid)
+        t = window["time"]
+        series = {v: window[v] for v in vitals}
+    return _frames(t, series, vitals, budget)
+
+
+def history_frames(log, pid, start_ns=None, end_ns=None, vitals=VITALS, budget=BUDGET):
+    """Same as :func:`chart_frames` for a time range read from a VitalsLog."""
+    window = log.read(pid, start_ns, end_ns)
+    return _frames(window["time"], window, vitals, budget)
+
+
+def range_frames(store, rollup, pid, start_ns, end_ns=None, log=None, vitals=VITALS, budget=BUDGET):
+    """``({vital: DataFrame}, level)`` for a time range, ≤ ``budget`` rows, whatever its length.
+
+    Ranges of at most ``budget`` samples are drawn raw (from the store, or
+    from ``log`` if they reach back further); longer ones come from the
+    finest rollup tier that fits (``level`` is its name) with the bucket
+    ``min`` / ``max`` as extra columns.  With ``log``, buckets from before
+    the dashboard started are loaded into the rollups once.  Call it while
+    holding the registry lock; ``pid`` must have samples.
+    """
+    window = store.window(pid)
+    end_ns = int(window["time"][-1].view(np.int64)) + 1 if end_ns is None else end_ns
+    if int((end_ns - start_ns) / (store.sample_interval * 1e9)) <= budget:
+        if start_ns >= window["time"][0].view(np.int64) or log is None:
+            t = window["time"].view(np.int64)
+            lo, hi = np.searchsorted(t, [start_ns, end_ns])
+            lo = max(lo, hi - budget)  # a sample on both range edges
+            frames = _frames(window["time"][lo:hi], {v: window[v][lo:hi] for v in vitals}, vitals, budget)
+        else:
+            frames = history_frames(log, pid, start_ns, end_ns, vitals, budget)
+        return {v: f.reset_index() for v, f in frames.items()}, "raw"
+    if log is not None:
+        rollup.backfill(pid, log, start_ns)
+    level = rollup.level_for(end_ns - start_ns, budget)
+    agg = {name: col.to_numpy() for name, col in rollup.range(pid, level, start_ns, end_ns).items()}
+    return {
+        v: pd.DataFrame({"time": agg["start"], v: agg[v], "min": agg[f"{v}_min"], "max": agg[f"{v}_max"]})
+        for v in vitals
+    }, level
+
+
+def news_frame(store, news, pid, budget=BUDGET):
+    """The early-warning score history of ``pid`` as one ``NEWS`` frame, ≤ ``budget`` rows."""
+    score = news.window(pid)
+    t = store.window(pid, len(score))["time"]
+    return _frames(t, {"NEWS": score}, ("NEWS",), budget)["NEWS"]
+
+
+def annotate(frames, events):
+    """Frames (with a ``time`` column) plus one marked row per anomaly event.
+
+    ``events`` is :meth:`AnomalyDetector.events` output; its rows are added
+    to the frame of their vital with the kind in an ``anomaly`` column,
+    which is empty on the plain rows.
+    """
+    out = {}
+    for vital, frame in frames.items():
+        marks = events[events["vital"] == vital]
+        marks = pd.DataFrame({"time": marks["time"], vital: marks["value"], "anomaly": marks["kind"]})
+        out[vital] = pd.concat([frame.assign(anomaly=None), marks], ignore_index=True)
+    return out
+
+
+def with_forecast(frames, forecast):
+    """Frames plus the ``forecast`` / ``lo`` / ``hi`` rows of :meth:`TrendForecaster.project`."""
+    return {vital: pd.concat([frame, forecast[vital]], ignore_index=True) for vital, frame in frames.items()}
+
+
+def _frames(t, series, vitals, budget):
+    ys = np.vstack([series[v] for v in vitals]).astype(float)
+    idx = lttb(t.view(np.int64), ys, budget)
+    return {
+        v: pd.DataFrame({v: ys[i, idx[i]]}, index=pd.DatetimeIndex(t[idx[i]], name="time"))
+        for i, v in enumerate(vitals)
+    }
+
+
+def line_spec(vital):
+    """Static Vega-Lite spec for one ``chart_frames`` frame (after ``reset_index()``).
+
+    Rendering through a fixed spec skips the Altair chart construction that
+    ``st.line_chart`` repeats on every call, which dominated rerun time.
+    """
+    return {
+        "mark": {"type": "line", "tooltip": True},
+        "encoding": {
+            "x": {"field": "time", "type": "temporal", "title": None},
+            "y": {"field": vital, "type": "quantitative", "scale": {"zero": False}},
+        },
+    }
+
+
+def annotated_spec(vital):
+    """:func:`line_spec` plus the extra rows of :func:`annotate` and :func:`with_forecast`.
+
+    Anomaly rows are drawn as points, forecast rows as a dashed line in a
+    shaded band and the ``min`` / ``max`` columns of :func:`range_frames`
+    as an envelope; frames without them render as the plain line.
+    """
+    line = line_spec(vital)
+    # One axis title for all layers (Vega-Lite would join the field names).
+    x, y = line["encoding"]["x"], {**line["encoding"]["y"], "title": vital}
+    line["encoding"]["y"] = y
+    line["transform"] = [{"filter": "!isValid(datum.anomaly) && !isValid(datum.forecast)"}]
+    marks = {
+        "transform": [{"filter": "isValid(datum.anomaly)"}],
+        "mark": {"type": "point", "filled": True, "size": 80, "tooltip": True},
+        "encoding": {
+            "x": x,
+            "y": y,
+            "color": {"field": "anomaly", "type": "nominal", "title": None,
+                      "scale": {"domain": ["shift", "drift"], "range": ["#d62728", "#ff7f0e"]}},
+        },
+    }
+    ahead = [{"filter": "isValid(datum.forecast)"}]
+    band = {
+        "transform": ahead,
+        "mark": {"type": "area", "opacity": 0.2, "color": "#9467bd"},
+        "encoding": {"x": x, "y": {**y, "field": "lo"}, "y2": {"field": "hi"}},
+    }
+    forecast = {
+        "transform": ahead,
+        "mark": {"type": "line", "strokeDash": [4, 4], "color": "#9467bd", "tooltip": True},
+        "encoding": {"x": x, "y": {**y, "field": "forecast"}},
+    }
+    envelope = {
+        "transform": [{"filter": "isValid(datum.min)"}],
+        "mark": {"type": "area", "opacity": 0.25},
+        "encoding": {"x": x, "y": {**y, "field": "min"}, "y2": {"field": "max"}},
+    }
+    return {"layer": [envelope, band, line, forecast, marks]}
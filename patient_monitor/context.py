@@ -0,0 +1,114 @@
+"""Patient context for the AI assistant, within a fixed token budget.
+
+The assistant used to receive only the caregiver's question, so numbers had
+to be typed in by hand and the answers stayed generic.  :func:`summarize`
+condenses what the dashboard already keeps for the selected patient -- age,
+gender and age group, the current alert level, the latest sample and the
+per-minute means from the 1-minute rollup -- into a few short lines, and
+:func:`build_prompt` puts them in front of the question.
+
+The summary is cut to ``budget`` tokens by dropping the oldest minutes of
+the trend first (then the trend altogether), so the prompt -- and with it
+latency and cost -- stays bounded however long the history is.  Tokens are
+estimated at four characters each, which is close enough for a budget.
+
+It only reads the rollup ring and one sample per patient; the page caches
+the result per data version like the other views.  Answers given with a
+context are cached per patient, alert level and age group, for
+``CONTEXT_TTL`` seconds only: the vitals change every second, so a hash of
+the exact context would never hit again, while a short lifetime keeps an
+answer from outliving the situation it was given for.
+"""
+
+import math
+
+from .store import VITALS
+
+DEFAULT_BUDGET = 160
+TREND_MINUTES = 15
+# Seconds an answer given with a patient's context stays in the response cache.
+CONTEXT_TTL = 300
+
+UNITS = {"HR": "bpm", "SpO2": "%", "BP": "mmHg", "Temp": "°C"}
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / 4)
+
+
+def _fmt(vital, value):
+    return f"{value:.1f}" if vital == "Temp" else f"{value:.0f}"
+
+
+def summarize(registry, alert_engine, pid, minutes=TREND_MINUTES):
+    """Everything the prompt may mention about ``pid``, or None without data.
+
+    Keys: ``age``, ``gender``, ``group`` (alert-rule age group), ``level``,
+    ``latest`` (``{vital: value}``) and ``trend`` (``{vital: [per-minute
+    means]}``, oldest first, at most ``minutes`` long).
+    """
+    with registry.reading():
+        patient = registry.get(pid)
+        store = registry.store
+        if pid not in store or not store.total(pid):
+            return None
+        age = patient["age"]
+        latest = store.latest(pid)
+        level = alert_engine.evaluate(store, [pid], [age])[pid]
+        table = registry.rollup.table(pid, "1min", n=minutes, stats=("mean", "count"))
+
+    table = table[table["count"] > 0]
+    group = None
+    if age is not None and alert_engine.group_names:
+        group = alert_engine.group_names[min(int(alert_engine.group_of([age])[0]),
+                                             len(alert_engine.group_names) - 1)]
+    return {
+        "age": age,
+        "gender": patient["gender"],
+        "group": group,
+        "level": str(level),
+        "latest": {v: latest[v] for v in VITALS},
+        "trend": {v: table[v].to_numpy(dtype=float) for v in VITALS},
+    }
+
+
+def render(summary, budget=DEFAULT_BUDGET):
+    """The summary as compact text of at most ``budget`` estimated tokens."""
+    who = [f"{summary['age']} y" if summary["age"] is not None else None,
+           summary["gender"] or None, summary["group"]]
+    head = [
+        f"Patient: {', '.join(w for w in who if w)}. Alert level: {summary['level']}.",
+        "Latest: " + ", ".join(f"{v} {_fmt(v, summary['latest'][v])} {UNITS[v]}" for v in VITALS),
+    ]
+    trend = summary["trend"]
+    n = len(trend[VITALS[0]])
+    while n > 1:
+        lines = [f"Per-minute averages, last {n} min (oldest first):"]
+        lines += [f"{v}: " + " ".join(_fmt(v, x) for x in trend[v][-n:]) for v in VITALS]
+        text = "\n".join(head + lines)
+        if estimate_tokens(text) <= budget:
+            return text
+        # Shrink towards the budget in one step, then one minute at a time.
+        over = estimate_tokens(text) / budget
+        n = min(n - 1, int(n / over)) if over > 1.5 else n - 1
+    text = "\n".join(head)
+    return text if estimate_tokens(text) <= budget else head[0][:budget * 4]
+
+
+def build_prompt(query, summary, budget=DEFAULT_BUDGET):
+    """``query`` preceded by the patient context (unchanged without a summary)."""
+    if summary is None:
+        return query
+    return f"Current patient data:\n{render(summary, budget)}\n\nQuestion: {query}"
+
+
+def cache_namespace(base, pid, summary):
+    """Namespace for cached answers given under this context.
+
+    Answers are about one patient's situation, so cached ones are only
+    reused for the same patient, alert level and age group (store them with
+    ``ttl=CONTEXT_TTL``).
+    """
+    if summary is None:
+        return base
+    return f"{base}|{pid}|{summary['level']}|{summary['group'] or '-'}"
@@ -0,0 +1,162 @@
+"""Short-horizon trend forecast per vital and "predicted RED".
+
+The alert levels fire only after a vital has been past its limit for the
+whole rule window, i.e. after the fact.  :class:`TrendForecaster` keeps a
+Holt (additive trend) state per patient and vital -- a smoothed level, a
+smoothed slope and the variance of the one-step errors -- and updates it
+with every appended sample in O(1), vectorized across the ward; nothing is
+ever refitted.  From that state it projects the next few minutes with the
+usual Holt prediction band (``level + h * slope ± z * sd(h)``) and checks
+the band against the alert limits of the patient's age group.
+
+A patient is **predicted RED** once even the near edge of the band crosses
+a RED limit within ``horizon_s`` and has kept doing so for ``confirm_s``
+seconds (the slope of a noisy vital wanders, the same way the alert window
+keeps single out-of-range samples from firing).  :meth:`status` also
+estimates when the level would fire: where the projected vital reaches the
+limit, plus the rule window.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .store import VITALS
+
+# Time constants (seconds) of the level and the slope.
+LEVEL_S, TREND_S = 10.0, 1000.0
+
+HORIZON_S = 300.0
+CONFIRM_S = 30.0
+BAND_Z = 1.0
+
+# Horizons (fractions of horizon_s) at which the band is checked every tick.
+_CHECKS = np.linspace(0.1, 1.0, 10)
+
+_NV = len(VITALS)
+
+
+class TrendForecaster:
+    """Holt forecasts and predicted alert level for every patient of a VitalsStore.
+
+    Subscribes to ``store``, which must not hold samples yet.  Limits come
+    from ``alert_engine`` for ``level``; tell it each patient's age with
+    :meth:`set_age` (the base limits apply until then).  Nothing is
+    predicted during the first ``warmup`` samples of a patient.
+    """
+
+    def __init__(self, store, alert_engine, level="RED", horizon_s=HORIZON_S, z=BAND_Z,
+                 confirm_s=CONFIRM_S, warmup=120):
+        self.store = store
+        self.engine = alert_engine
+        self.level = level
+        self.dt = store.sample_interval
+        self.horizon = max(int(round(horizon_s / self.dt)), 1)
+        self.z = z
+        self.confirm = max(int(round(confirm_s / self.dt)), 1)
+        self.warmup = warmup
+        self.alpha = 1.0 - np.exp(-self.dt / LEVEL_S)
+        self.beta = 1.0 - np.exp(-self.dt / TREND_S)
+        li = list(alert_engine.names).index(level)
+        self.high, self.low = alert_engine.high[li], alert_engine.low[li]  # (group, vital)
+        self.window = int(alert_engine.windows[li])
+        self._checks = np.maximum(np.rint(_CHECKS * self.horizon), 1)
+        self._alloc(max(len(store), 1))
+        store.subscribe(self.update)
+
+    def _alloc(self, slots, old=None):
+        state = {
+            "_n": np.zeros(slots, dtype=np.int64),
+            "_level": np.zeros((slots, _NV)),
+            "_trend": np.zeros((slots, _NV)),
+            "_var": np.zeros((slots, _NV)),
+            "_group": np.full(slots, len(self.high) - 1, dtype=np.intp),
+            "_streak": np.zeros(slots, dtype=np.int64),
+        }
+        if old is not None:
+            for name, arr in state.items():
+                arr[: len(old[name])] = old[name]
+        self.__dict__.update(state)
+        self._names = tuple(state)
+
+    def _ensure(self, slot):
+        if slot >= len(self._n):
+            self._alloc(max(2 * len(self._n), slot + 1), {name: getattr(self, name) for name in self._names})
+
+    def set_age(self, pid, age):
+        slot = self.store.add_patient(pid)
+        self._ensure(slot)
+        self._group[slot] = self.engine.group_of([np.nan if age is None else age])[0]
+
+    def update(self, slots, times, values):
+        self._ensure(int(slots.max()))
+        x = np.column_stack([np.asarray(values[v], dtype=np.float64) for v in VITALS])
+        first = self._n[slots] == 0
+        level, trend, var = self._level[slots], self._trend[slots], self._var[slots]
+        err = np.where(first[:, None], 0.0, x - (level + trend))
+        level = np.where(first[:, None], x, level + trend + self.alpha * err)
+        trend += self.beta * err
+        # Short start-up average, then an exponential one (~100 samples).
+        var += (err * err - var) / np.minimum(self._n[slots] + 1, 100)[:, None]
+        self._level[slots], self._trend[slots], self._var[slots] = level, trend, var
+        self._n[slots] += 1
+
+        mean, sd = self._band(level, trend, var, self._checks)
+        group = self._group[slots]
+        hi, lo = self.high[group][:, None], self.low[group][:, None]
+        crossing = ((mean - self.z * sd > hi) | (mean + self.z * sd < lo)).any(axis=(1, 2))
+        crossing &= self._n[slots] >= self.warmup
+        self._streak[slots] = np.where(crossing, self._streak[slots] + 1, 0)
+
+    def _band(self, level, trend, var, h):
+        """Mean and standard deviation ``h`` steps ahead, shaped (patients, len(h), vitals)."""
+        h = np.asarray(h, dtype=float)[None, :, None]
+        a, b = self.alpha, self.beta
+        mean = level[:, None] + h * trend[:, None]
+        sd = np.sqrt(var[:, None] * (1 + (h - 1) * (a * a + a * b * h + b * b * h * (2 * h - 1) / 6)))
+        return mean, sd
+
+    def project(self, pid, points=20):
+        """``{vital: DataFrame}`` of ``time``, ``forecast``, ``lo`` and ``hi`` up to the horizon.
+
+        Starts at the newest sample; empty frames without data.
+        """
+        slot = self.store.slot(pid)
+        if slot >= len(self._n) or not self._n[slot]:
+            empty = pd.DataFrame({"time": pd.DatetimeIndex([]), "forecast": [], "lo": [], "hi": []})
+            return {v: empty for v in VITALS}
+        h = np.linspace(0, self.horizon, points + 1)
+        s = [slot]
+        mean, sd = self._band(self._level[s], self._trend[s], self._var[s], h)
+        mean, sd = mean[0], np.where(h[:, None] > 0, sd[0], 0.0)
+        start = self.store.window(pid, 1)["time"][0]
+        time = start + (h * self.dt * 1e9).astype("timedelta64[ns]")
+        return {
+            v: pd.DataFrame({"time": time, "forecast": mean[:, i],
+                             "lo": mean[:, i] - self.z * sd[:, i], "hi": mean[:, i] + self.z * sd[:, i]})
+            for i, v in enumerate(VITALS)
+        }
+
+    def status(self, pids):
+        """``(predicted, eta_s, vital)`` arrays aligned with ``pids``.
+
+        ``predicted`` is the confirmed prediction; ``eta_s`` the estimated
+        seconds until the level fires (NaN unless predicted) and ``vital``
+        the vital expected to cross first (None unless predicted).
+        """
+        slots = np.fromiter((self.store.slot(p) for p in pids), dtype=np.intp, count=len(pids))
+        known = slots < len(self._n)
+        slots = np.where(known, slots, 0)
+        predicted = known & (self._streak[slots] >= self.confirm)
+        level, trend = self._level[slots], self._trend[slots]
+        group = self._group[slots]
+        hi, lo = self.high[group], self.low[group]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Steps until the projected level reaches each limit (0 if already past it).
+            steps = np.minimum(np.where(trend > 0, (hi - level) / trend, np.inf),
+                               np.where(trend < 0, (lo - level) / trend, np.inf))
+            steps = np.where((level > hi) | (level < lo), 0.0, np.maximum(steps, 0.0))
+        first = steps.argmin(axis=1)
+        steps = steps[np.arange(len(pids)), first]
+        eta = np.where(predicted & np.isfinite(steps), (steps + self.window) * self.dt, np.nan)
+        vital = np.array(VITALS, dtype=object)[first]
+        return predicted, eta, np.where(predicted, vital, None)
@@ -0,0 +1,182 @@
+"""Headless vitals ingestion service.
+
+Run it next to the dashboards::
+
+    python -m patient_monitor.ingest --hz 1 --port 7400
+
+Every tick (at a fixed rate, independent of any browser) it simulates one
+sample for each registered patient without a live device feed, adds the
+samples received over TCP since the last tick (one JSON object per line:
+``{"pid": "P1", "HR": 80, "SpO2": 97, "BP": 120, "Temp": 36.8}``) and writes
+the batch to the shared :class:`~patient_monitor.vitals_db.VitalsDB`.  The
+dashboards only read from that database.  With a
+:class:`~patient_monitor.vitals_log.VitalsLog` every batch is also appended
+to the durable on-disk history, and with ``--shm NAME`` it is published to
+a shared-memory segment the dashboards read without touching the database
+(see :mod:`patient_monitor.shm`).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import threading
+import time
+
+from .shm import ShmWriter
+from .simulator import WardSimulator
+from .store import VITALS
+from .vitals_db import DEFAULT_DB, VitalsDB, check_pid, now_ns
+from .vitals_log import DEFAULT_LOG, VitalsLog
+
+log = logging.getLogger(__name__)
+
+
+class IngestionService:
+    """Fixed-rate sampler that batches samples into a VitalsDB.
+
+    ``live_timeout`` is how long (seconds) a patient counts as having a
+    device feed after its last received sample; meanwhile it is not simulated.
+    Simulated patients come from a :class:`~patient_monitor.simulator.WardSimulator`
+    (``seed`` makes the run reproducible, ``deteriorate`` is the fraction of
+    patients that slide towards RED within the first hour).
+    """
+
+    def __init__(self, db, hz=1.0, simulate=True, keep_hours=1.0, live_timeout=5.0, log=None,
+                 seed=None, deteriorate=0.1, shm=None):
+        self.db = db
+        self.log = log
+        self.shm = ShmWriter(shm) if shm else None
+        self.period = 1.0 / hz
+        self.simulate = simulate
+        self.simulator = WardSimulator(hz=hz, seed=seed, deteriorate=deteriorate)
+        self.keep_hours = keep_hours
+        self.live_timeout = live_timeout
+        self.ticks = 0
+        self.late_ticks = 0
+        self._pending = []
+        self._live = {}  # pid -> time of its last received sample, while live
+
+    # ---------- receiving ----------
+    def submit(self, sample):
+        """Queue one received sample for the next tick (raises on bad input)."""
+        pid = str(sample["pid"])
+        check_pid(pid)
+        values = [float(sample[v]) for v in VITALS]
+        if not all(math.isfinite(x) for x in values):
+            raise ValueError(f"non-finite vitals for {pid}: {values}")
+        row = (pid, int(sample.get("t") or now_ns()), *values)
+        self._pending.append(row)
+        self._live[pid] = time.monotonic()
+
+    def _forget_stale(self, now):
+        """Drop device feeds past ``live_timeout`` so ids that stopped sending do not pile up."""
+        for pid, seen in list(self._live.items()):
+            if now - seen > self.live_timeout and self._live.get(pid) == seen:
+                del self._live[pid]
+
+    async def _handle_client(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        try:
+            async for line in reader:
+                if not line.strip():
+                    continue
+                try:
+                    self.submit(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    log.warning("bad sample from %s: %s", peer, e)
+        finally:
+            writer.close()
+
+    # ---------- loops ----------
+    async def _ticker(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            patients = await asyncio.to_thread(self.db.patients)
+            t = now_ns()
+            batch, self._pending = self._pending, []
+            self._forget_stale(time.monotonic())
+            if self.simulate:
+                new = [pid for pid in patients if pid not in self.simulator]
+                self.simulator.add(new, [patients[pid]["age"] for pid in new])
+                now = time.monotonic()
+                pids = [pid for pid in patients
+                        if now - self._live.get(pid, float("-inf")) > self.live_timeout]
+                values = self.simulator.step(pids)
+                batch.extend(zip(pids, [t] * len(pids), *(values[v].tolist() for v in VITALS)))
+            if self.shm is not None:
+                self.shm.write(batch)
+            await asyncio.to_thread(self.db.insert_vitals, batch)
+            if self.log is not None:
+                await asyncio.to_thread(self.log.write, batch)
+            self.ticks += 1
+
+            # Fixed-rate schedule; a late tick is counted, not made up in a burst.
+            next_tick += self.period
+            delay = next_tick - loop.time()
+            if delay < 0:
+                self.late_ticks += 1
+                next_tick = loop.time()
+            await asyncio.sleep(max(delay, 0))
+
+    async def _pruner(self, every=60.0):
+        while True:
+            removed = await asyncio.to_thread(self.db.prune, now_ns() - int(self.keep_hours * 3600e9))
+            if removed:
+                log.info("pruned %d old samples", removed)
+            await asyncio.sleep(every)
+
+    async def run(self, host="127.0.0.1", port=None):
+        server = None
+        if port:
+            server = await asyncio.start_server(self._handle_client, host, port)
+            log.info("listening for device samples on %s:%s", host, port)
+        try:
+            await asyncio.gather(self._ticker(), self._pruner())
+        finally:
+            if server:
+                server.close()
+            if self.log is not None:
+                self.log.flush()
+            if self.shm is not None:
+                self.shm.close()
+
+
+def start_in_thread(db, **kwargs):
+    """Run an IngestionService on a daemon thread (embedded mode)."""
+    service = IngestionService(db, **kwargs)
+    threading.Thread(target=asyncio.run, args=(service.run(),), name="vitals-ingest", daemon=True).start()
+    return service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vitals ingestion service")
+    parser.add_argument("--db", default=str(DEFAULT_DB), help="shared SQLite file")
+    parser.add_argument("--hz", type=float, default=1.0, help="samples per second per patient")
+    parser.add_argument("--keep-hours", type=float, default=1.0, help="history kept in the database")
+    parser.add_argument("--log", default=str(DEFAULT_LOG), help="directory of the durable vitals log")
+    parser.add_argument("--no-log", action="store_true", help="do not write the durable log")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="TCP port for JSON-lines device samples")
+    parser.add_argument("--no-simulate", action="store_true", help="only record received samples")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible simulated vitals")
+    parser.add_argument("--deteriorate", type=float, default=0.1, help="fraction of simulated patients that deteriorate")
+    parser.add_argument("--shm", help="also publish vitals to this shared-memory segment")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    service = IngestionService(
+        VitalsDB(args.db), hz=args.hz, simulate=not args.no_simulate, keep_hours=args.keep_hours,
+        log=None if args.no_log else VitalsLog(args.log), seed=args.seed, deteriorate=args.deteriorate,
+        shm=args.shm
+    )
+    try:
+        asyncio.run(service.run(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
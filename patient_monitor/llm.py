@@ -0,0 +1,246 @@
+"""Shared LLM client: pooled connections, retries and provider failover.
+
+One :class:`LLMClient` per process keeps a ``requests.Session`` with a
+connection pool per provider (keep-alive instead of a new TLS handshake per
+question), caps concurrent upstream calls, retries 429 / 5xx / connection
+errors with jittered exponential backoff and then fails over to the next
+provider.  Per-provider latency is recorded for the dashboards.
+
+Base URLs are constructor arguments (``OPENROUTER_BASE_URL`` /
+``GEMINI_BASE_URL`` in :meth:`LLMClient.from_env`), so the client can be
+pointed at a local stub server.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+SYSTEM_PROMPT = "You are a medical assistant. Answer shortly in Hinglish."
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class AIError(Exception):
+    """No provider produced an answer."""
+
+
+class _RetryableError(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _sse_data(response):
+    """Yield the JSON payload of every ``data:`` line of an SSE response."""
+    # chunk_size=None hands over each chunk as it arrives instead of
+    # waiting for 512 bytes, so tokens are not held back.
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        yield json.loads(data)
+
+
+class OpenRouter:
+    name = "openrouter"
+
+    def __init__(self, api_key, model="mistralai/mistral-7b-instruct:free",
+                 base_url="https://openrouter.ai/api/v1", headers=None):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.headers = headers or {}
+
+    def request(self, query, system, temperature, max_tokens):
+        messages = [{"role": "user", "content": query}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        body = {"model": self.model, "messages": messages, "temperature": temperature, "stream": True}
+        if max_tokens:
+            body["max_tokens"] = max_tokens
+        headers = {"Authorization": f"Bearer {self.api_key}", **self.headers}
+        return f"{self.base_url}/chat/completions", headers, body
+
+    def chunks(self, event):
+        for choice in event.get("choices", []):
+            text = (choice.get("delta") or {}).get("content")
+            if text:
+                yield text
+
+
+class Gemini:
+    name = "gemini"
+
+    def __init__(self, api_key, model="gemini-2.5-flash",
+                 base_url="https://generativelanguage.googleapis.com/v1beta"):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, query, system, temperature, max_tokens):
+        prompt = f"{system}\nUser: {query}\nAnswer:" if system else query
+        body = {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": {"temperature": temperature, "maxOutputTokens": max_tokens or 300}
+        }
+        url = f"{self.base_url}/models/{self.model}:streamGenerateContent?alt=sse"
+        return url, {"x-goog-api-key": self.api_key}, body
+
+    def chunks(self, event):
+        for candidate in event.get("candidates", []):
+            for part in candidate.get("content", {}).get("parts", []):
+                if part.get("text"):
+                    yield part["text"]
+
+
+class LLMClient:
+    """Streaming chat client over an ordered list of providers.
+
+    A provider that exhausts its retries is skipped for ``cooldown`` seconds
+    so the following questions go straight to the next one.
+    """
+
+    def __init__(self, providers, pool_size=8, max_concurrency=4, retries=2,
+                 backoff=0.5, max_backoff=8.0, timeout=30, cooldown=60.0):
+        self.providers = [p for p in providers if p.api_key]
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.cooldown = cooldown
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max(len(self.providers), 1), pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Content-Type"] = "application/json"
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._down_until = {}
+        self._stats = {
+            p.name: {"ok": 0, "errors": 0, "retries": 0,
+                     "first_token": deque(maxlen=200), "total": deque(maxlen=200)}
+            for p in self.providers
+        }
+
+    @classmethod
+    def from_env(cls, order=("openrouter", "gemini"), openrouter_model=None, gemini_model=None, **kwargs):
+        """Build a client from ``OPENROUTER_API_KEY`` / ``GEMINI_API_KEY``."""
+        make = {
+            "openrouter": lambda: OpenRouter(
+                os.getenv("OPENROUTER_API_KEY"),
+                **({"model": openrouter_model} if openrouter_model else {}),
+                base_url=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
+                headers={"HTTP-Referer": "http://localhost:8501", "X-Title": "Smart Patient Monitoring"}
+            ),
+            "gemini": lambda: Gemini(
+                os.getenv("GEMINI_API_KEY"),
+                **({"model": gemini_model} if gemini_model else {}),
+                base_url=os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+            ),
+        }
+        return cls([make[name]() for name in order], **kwargs)
+
+    def __bool__(self):
+        return bool(self.providers)
+
+    # ---------- calls ----------
+    def _ordered(self):
+        now = time.monotonic()
+        with self._lock:
+            up = [p for p in self.providers if self._down_until.get(p.name, 0) <= now]
+        return up + [p for p in self.providers if p not in up]
+
+    def _sleep(self, attempt, retry_after):
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        time.sleep(delay)
+
+    def _attempt(self, provider, query, system, temperature, max_tokens):
+        url, headers, body = provider.request(query, system, temperature, max_tokens)
+        stats = self._stats[provider.name]
+        start = time.perf_counter()
+        with self._slots:
+            try:
+                res = self.session.post(url, headers=headers, json=body, stream=True, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                raise _RetryableError(f"{provider.name}: {e}") from e
+            with res:
+                if res.status_code in RETRY_STATUS:
+                    retry_after = res.headers.get("Retry-After")
+                    raise _RetryableError(
+                        f"{provider.name} HTTP {res.status_code}",
+                        float(retry_after) if retry_after and retry_after.isdigit() else None
+                    )
+                if res.status_code != 200:
+                    raise AIError(f"{provider.name} HTTP {res.status_code}")
+                first = True
+                for event in _sse_data(res):
+                    for text in provider.chunks(event):
+                        if first:
+                            stats["first_token"].append(time.perf_counter() - start)
+                            first = False
+                        yield text
+        stats["total"].append(time.perf_counter() - start)
+
+    def stream(self, query, system=SYSTEM_PROMPT, temperature=0.5, max_tokens=None):
+        """Yield answer chunks, retrying and failing over before the first token.
+
+        Once a provider has produced text, an error is re-raised instead of
+        silently switching providers mid-answer.
+        """
+        errors = []
+        for provider in self._ordered():
+            stats = self._stats[provider.name]
+            for attempt in range(self.retries + 1):
+                produced = False
+                try:
+                    for text in self._attempt(provider, query, system, temperature, max_tokens):
+                        produced = True
+                        yield text
+                    stats["ok"] += 1
+                    with self._lock:
+                        self._down_until.pop(provider.name, None)
+                    return
+                except _RetryableError as e:
+                    stats["errors"] += 1
+                    errors.append(str(e))
+                    if produced:
+                        raise AIError(str(e)) from e
+                    if attempt < self.retries:
+                        stats["retries"] += 1
+                        self._sleep(attempt, e.retry_after)
+                except (AIError, requests.RequestException, ValueError) as e:
+                    stats["errors"] += 1
+                    errors.append(str(e))
+                    if produced:
+                        raise AIError(str(e)) from e
+                    break
+            with self._lock:
+                self._down_until[provider.name] = time.monotonic() + self.cooldown
+        raise AIError("; ".join(errors) or "no LLM provider configured")
+
+    def complete(self, query, **kwargs):
+        """Whole answer as one string."""
+        return "".join(self.stream(query, **kwargs))
+
+    def stats(self):
+        """Per-provider counters and p50 / p95 latencies in milliseconds."""
+        out = {}
+        for name, s in self._stats.items():
+            row = {k: s[k] for k in ("ok", "errors", "retries")}
+            for key in ("first_token", "total"):
+                values = np.array(s[key]) * 1000
+                for q in (50, 95):
+                    row[f"{key}_p{q}_ms"] = round(float(np.percentile(values, q)), 1) if len(values) else None
+            out[name] = row
+        return out
@@ -0,0 +1,93 @@
+"""NEWS2-style early-warning score, kept per sample for every patient.
+
+The alert levels only say whether a vital has been out of range for a whole
+window.  The National Early Warning Score instead gives each vital 0-3
+points by how far it is from normal and adds them up, so a patient who is a
+little off on everything ranks above one with a single borderline value.
+Only the four vitals the monitors deliver are scored (heart rate, SpO2 on
+scale 1, systolic BP, temperature); respiration rate, oxygen therapy and
+consciousness are not measured here, so totals run lower than a full NEWS2.
+
+Scoring is a ``searchsorted`` per vital over whole arrays, so any shape
+works: one sample, a ward-wide tick or a ``(patients, samples)`` tail.
+:class:`NewsScorer` subscribes to a VitalsStore like the rollups do and
+scores every appended sample once, into a score ring kept by the store
+next to the vitals, so the score history can be charted next to the vitals and a
+ward's current scores are one gather.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .store import VITALS
+
+# Upper edges between bands (half-way between monitor resolutions) and the
+# points of each band, lowest band first.
+BANDS = {
+    "HR": ([40.5, 50.5, 90.5, 110.5, 130.5], [3, 1, 0, 1, 2, 3]),
+    "SpO2": ([91.5, 93.5, 95.5], [3, 2, 1, 0]),
+    "BP": ([90.5, 100.5, 110.5, 219.5], [3, 2, 1, 0, 3]),
+    "Temp": ([35.05, 36.05, 38.05, 39.05], [3, 1, 0, 1, 2]),
+}
+
+RISK = np.array(["LOW", "LOW-MEDIUM", "MEDIUM", "HIGH"], dtype=object)
+
+_EDGES = {v: np.array(BANDS[v][0]) for v in VITALS}
+_POINTS = {v: np.array(BANDS[v][1], dtype=np.int8) for v in VITALS}
+
+
+def component_scores(values):
+    """Points per vital, ``{vital: int8 array}`` shaped like the inputs."""
+    return {v: _POINTS[v][np.searchsorted(_EDGES[v], np.asarray(values[v], dtype=float))]
+            for v in VITALS}
+
+
+def score_arrays(HR, SpO2, BP, Temp):
+    """``(total, red)``: summed points and whether any single vital scored 3."""
+    parts = component_scores({"HR": HR, "SpO2": SpO2, "BP": BP, "Temp": Temp})
+    total = sum(parts[v].astype(np.int8) for v in VITALS)
+    red = np.logical_or.reduce([parts[v] == 3 for v in VITALS])
+    return total, red
+
+
+def risk(total, red):
+    """NEWS2 clinical risk per score: 7+ HIGH, 5-6 MEDIUM, a single 3 LOW-MEDIUM."""
+    total = np.asarray(total)
+    band = np.where(total >= 7, 3, np.where(total >= 5, 2, np.where(red, 1, 0)))
+    return RISK[band]
+
+
+class NewsScorer:
+    """Per-sample scores for every patient of a VitalsStore.
+
+    Subscribes to ``store`` and keeps the scores in rings of the store
+    (:meth:`VitalsStore.add_ring`), so ``window(pid, n)`` lines up with
+    ``store.window(pid, n)``.  Samples appended before it subscribed score 0.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        store.add_ring("NEWS", np.int8)
+        store.add_ring("NEWS_red", bool)
+        store.subscribe(self.update)
+
+    def update(self, slots, times, values):
+        total, red = score_arrays(**values)
+        self.store.put_ring(slots, NEWS=total, NEWS_red=red)
+
+    def window(self, pid, n=None):
+        """Oldest-first view of the last ``n`` scores of ``pid``."""
+        return self.store.ring_window("NEWS", pid, n)
+
+    def frame(self, pid, n=None):
+        """DataFrame with ``time`` and ``NEWS`` over the last ``n`` samples."""
+        score = self.window(pid, n)
+        time = self.store.window(pid, len(score))["time"]
+        return pd.DataFrame({"time": time, "NEWS": score})
+
+    def latest(self, pids):
+        """``(score, risk, has_data)`` arrays aligned with ``pids``, one gather each."""
+        store = self.store
+        slots = np.fromiter((store.slot(p) for p in pids), dtype=np.intp, count=len(pids))
+        latest, has = store.ring_latest(slots, "NEWS", "NEWS_red")
+        return latest["NEWS"], risk(latest["NEWS"], latest["NEWS_red"]), has
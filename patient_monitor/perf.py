@@ -0,0 +1,108 @@
+"""Lightweight timing spans for the dashboard rerun.
+
+Wrap each stage of a rerun in ``with perf.span("charts"):`` and the tracker
+keeps the last ``window`` durations per stage, from which it reports rolling
+p50/p95/p99.  Stats export as Prometheus text or JSON lines.
+
+A disabled tracker hands out one shared no-op context manager, so the
+instrumentation can stay in the hot path at the cost of one attribute check.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+QUANTILES = (50, 95, 99)
+
+_NULL = nullcontext()
+
+
+class _Span:
+    __slots__ = ("tracker", "name", "started")
+
+    def __init__(self, tracker, name):
+        self.tracker = tracker
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracker.record(self.name, (time.perf_counter() - self.started) * 1e3)
+        return False
+
+
+class PerfTracker:
+    """Rolling per-stage timings (milliseconds), shared across sessions."""
+
+    def __init__(self, enabled=None, window=500):
+        if enabled is None:
+            enabled = os.getenv("PERF_TIMING", "").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+        self._totals = {}
+
+    def span(self, name):
+        """Context manager timing one stage (a shared no-op when disabled)."""
+        if not self.enabled:
+            return _NULL
+        return _Span(self, name)
+
+    def record(self, name, ms):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(ms)
+            self._counts[name] = self._counts.get(name, 0) + 1
+            self._totals[name] = self._totals.get(name, 0.0) + ms
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._totals.clear()
+
+    def stats(self):
+        """``{stage: {"count", "total_ms", "last_ms", "p50_ms", ...}}`` in first-seen order.
+
+        ``count`` and ``total_ms`` cover every call; the quantiles only the
+        last ``window`` calls.
+        """
+        with self._lock:
+            snapshot = {name: (np.array(s), self._counts[name], self._totals[name])
+                        for name, s in self._samples.items()}
+        out = {}
+        for name, (ms, count, total) in snapshot.items():
+            row = {"count": count, "total_ms": round(total, 3), "last_ms": round(float(ms[-1]), 3)}
+            for q, v in zip(QUANTILES, np.percentile(ms, QUANTILES)):
+                row[f"p{q}_ms"] = round(float(v), 3)
+            out[name] = row
+        return out
+
+    # ---------- export ----------
+    def prometheus(self, metric="dashboard_stage_seconds"):
+        """Stats in the Prometheus text exposition format (summary per stage)."""
+        lines = [f"# HELP {metric} Rolling duration of dashboard rerun stages.",
+                 f"# TYPE {metric} summary"]
+        for name, row in self.stats().items():
+            for q in QUANTILES:
+                lines.append(f'{metric}{{stage="{name}",quantile="{q / 100}"}} {row[f"p{q}_ms"] / 1e3:.6f}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {row["total_ms"] / 1e3:.6f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {row["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def json_lines(self):
+        """One JSON object per stage, stamped with the export time."""
+        now = time.time()
+        return "".join(json.dumps({"time": now, "stage": name, **row}) + "\n"
+                       for name, row in self.stats().items())
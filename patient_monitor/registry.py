@@ -0,0 +1,200 @@
+"""Process-wide patient registry shared by every dashboard session.
+
+Streamlit gives each browser tab its own ``st.session_state``; keeping
+patients and their vitals there meant one copy of every history per viewer
+and patients that other nurse stations could not see.  A single
+:class:`PatientRegistry` per server process (created through
+``st.cache_resource``) holds the patient list and one VitalsStore with its
+derived views (rollups, NEWS2 scores, anomaly flags, trend forecasts) for
+everybody, guarded by a lock.  With a VitalsDB the patient list is
+persisted and vitals come from the ingestion service, through the database
+or, with ``shm``, a shared-memory segment (:mod:`.shm`).
+
+Change counters (:meth:`PatientRegistry.version`) let views skip work when
+nothing new arrived; :meth:`PatientRegistry.follow` keeps the registry
+current from a background thread so page reruns never touch the database.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from .alerts import AlertEngine
+from .anomaly import AnomalyDetector
+from .forecast import TrendForecaster
+from .news import NewsScorer
+from .rollup import RollupEngine
+from .shm import ShmFeed
+from .store import VitalsStore
+from .vitals_db import VitalsFeed, check_pid
+
+log = logging.getLogger(__name__)
+
+
+class PatientRegistry:
+    """Patients plus their shared vitals history.
+
+    ``db`` is optional: without it patients live only in this process and
+    vitals must be pushed with :meth:`append`.  ``shm`` names the ingestion
+    service's shared-memory segment; while it is attached, vitals are read
+    from it instead of the database (which still backfills history at start
+    and takes over again when the segment goes away).
+    ``alert_engine`` supplies the limits the forecasts are checked against.
+    """
+
+    def __init__(self, db=None, retention_hours=1.0, sample_interval=1.0, min_refresh=0.2, shm=None,
+                 alert_engine=None):
+        self._lock = threading.RLock()
+        self.db = db
+        self.store = VitalsStore(retention_hours=retention_hours, sample_interval=sample_interval)
+        self.rollup = RollupEngine(self.store)
+        self.news = NewsScorer(self.store)
+        self.anomaly = AnomalyDetector(self.store)
+        self.forecast = TrendForecaster(self.store, alert_engine or AlertEngine())
+        self.feed = VitalsFeed(db, self.store) if db is not None else None
+        self.shm_feed = ShmFeed(shm, self.store) if shm else None
+        self.min_refresh = min_refresh
+        self._last_refresh = 0.0
+        self._patients = {}
+        self._version = 0
+        self._follower = None
+        self.refresh(force=True)
+
+    # ---------- patients ----------
+    def __contains__(self, pid):
+        with self._lock:
+            return pid in self._patients
+
+    def __len__(self):
+        with self._lock:
+            return len(self._patients)
+
+    def add_patient(self, pid, name="", age=None, gender=""):
+        """Register ``pid``; returns False if it is empty or already taken.
+
+        Raises ValueError for an ID longer than ``MAX_PID_BYTES``.
+        """
+        if not pid:
+            return False
+        check_pid(pid)
+        with self._lock:
+            if pid in self._patients:
+                return False
+            if self.db is not None and not self.db.add_patient(pid, name, age, gender):
+                self.refresh(force=True)
+                return False
+            self._patients[pid] = {"name": name, "age": age, "gender": gender}
+            self.store.add_patient(pid)
+            self.forecast.set_age(pid, age)
+            self._version += 1
+            return True
+
+    def get(self, pid):
+        with self._lock:
+            return dict(self._patients[pid])
+
+    def patients(self):
+        """Snapshot of ``{pid: info}`` in registration order."""
+        with self._lock:
+            return {pid: dict(info) for pid, info in self._patients.items()}
+
+    def version(self, pid=None):
+        """Counter that changes whenever ``pid`` (or, if None, anything) changes.
+
+        For a patient it is the number of samples ever appended, so views
+        keyed on it are recomputed only when new data arrived.
+        """
+        with self._lock:
+            if pid is None:
+                return self._version
+            return self.store.total(pid) if pid in self.store else 0
+
+    # ---------- vitals ----------
+    def append(self, pid, time, HR, SpO2, BP, Temp):
+        with self._lock:
+            self.store.append(pid, time, HR, SpO2, BP, Temp)
+            self._version += 1
+
+    def append_batch(self, pids, time, HR, SpO2, BP, Temp):
+        with self._lock:
+            self.store.append_batch(pids, time, HR, SpO2, BP, Temp)
+            self._version += 1
+
+    def refresh(self, force=False):
+        """Pull new patients and vitals from the database.
+
+        Calls closer together than ``min_refresh`` seconds are skipped, so any
+        number of sessions rerunning at once costs one poll.
+        """
+        if self.db is None:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self.min_refresh:
+                return 0
+            self._last_refresh = now
+            for pid, info in self.db.patients().items():
+                if pid not in self._patients:
+                    self._patients[pid] = info
+                    self.store.add_patient(pid)
+                    self.forecast.set_age(pid, info["age"])
+                    self._version += 1
+            rows = 0
+            if self.shm_feed is None or not self.shm_feed.attached:
+                rows += self.feed.poll()
+            if self.shm_feed is not None:
+                rows += self._poll_shm()
+            if rows:
+                self._version += 1
+            return rows
+
+    def poll_shm(self):
+        """Read new samples from the shared-memory segment only (cheap; no database)."""
+        if self.shm_feed is None or not self.shm_feed.attached:
+            return 0
+        with self._lock:
+            rows = self._poll_shm()
+            if rows:
+                self._version += 1
+            return rows
+
+    def _poll_shm(self):
+        attached = self.shm_feed.attached
+        rows = self.shm_feed.poll()
+        if attached and not self.shm_feed.attached and self.feed is not None:
+            # Segment gone: the database feed takes over from where the store is.
+            log.info("shared-memory segment %s is gone, reading vitals from the database", self.shm_feed.name)
+            self.feed.resync()
+        return rows
+
+    def follow(self, interval=0.5, shm_interval=0.005):
+        """Refresh from the database on a daemon thread every ``interval`` seconds.
+
+        With an attached shared-memory segment, vitals are additionally polled
+        from it every ``shm_interval`` seconds (an unchanged segment costs one
+        integer compare).
+        """
+        if self.db is None or self._follower is not None:
+            return
+        def loop():
+            next_refresh = 0.0
+            while True:
+                try:
+                    if time.monotonic() >= next_refresh:
+                        self.refresh(force=True)
+                        next_refresh = time.monotonic() + interval
+                    else:
+                        self.poll_shm()
+                except Exception:
+                    log.exception("registry refresh failed")
+                attached = self.shm_feed is not None and self.shm_feed.attached
+                time.sleep(shm_interval if attached else interval)
+        self._follower = threading.Thread(target=loop, name="registry-follow", daemon=True)
+        self._follower.start()
+
+    @contextmanager
+    def reading(self):
+        """Hold the registry lock while deriving several values from the store."""
+        with self._lock:
+            yield self
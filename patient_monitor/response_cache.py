@@ -0,0 +1,172 @@
+"""Local semantic cache for AI assistant answers.
+
+Caregivers ask the same handful of questions in slightly different words.
+Queries are normalized and turned into character 3-gram TF-IDF vectors; a new
+question reuses a cached answer when its cosine similarity to a stored one is
+above ``threshold`` *and* it mentions exactly the same numbers, so
+"SpO2 88 ho toh kya kare?" never answers "SpO2 94 ...".  Entries expire after
+``ttl`` seconds (or their own, shorter ``ttl`` given to ``put``), the least recently used are evicted past ``max_entries`` and
+the cache is persisted to a JSON file.  Everything is local; no network.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from pathlib import Path
+
+DEFAULT_PATH = Path(os.getenv("AI_CACHE") or Path(__file__).resolve().parent.parent / "ai_cache.json")
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_NOISE = re.compile(r"[^\w\s.]|(?<!\d)\.|\.(?!\d)")
+
+
+def normalize(query):
+    """Lower-case, strip punctuation and collapse whitespace."""
+    text = unicodedata.normalize("NFKC", query).lower()
+    return " ".join(_NOISE.sub(" ", text).split())
+
+
+def numbers(text):
+    return tuple(_NUMBER.findall(text))
+
+
+def ngrams(text, n=3):
+    padded = f" {text} "
+    return Counter(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache with near-duplicate lookup.
+
+    ``namespace`` separates answers produced under different prompts
+    (model, system prompt, ...); lookups never cross namespaces.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, ttl=24 * 3600, max_entries=500, threshold=0.8):
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()      # key -> {"answer", "time", "grams"}
+        self._postings = defaultdict(set)  # gram -> keys
+        self._df = Counter()               # gram -> document frequency
+        self._load()
+
+    # ---------- index ----------
+    @staticmethod
+    def _key(namespace, norm):
+        return f"{namespace}\x00{norm}"
+
+    def _index(self, key, grams):
+        for g in grams:
+            self._postings[g].add(key)
+            self._df[g] += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        for g in entry["grams"]:
+            self._postings[g].discard(key)
+            self._df[g] -= 1
+            if not self._df[g]:
+                del self._df[g], self._postings[g]
+
+    def _vector(self, grams):
+        n = len(self._entries) + 1
+        vec = {g: c * (math.log((n + 1) / (self._df.get(g, 0) + 1)) + 1) for g, c in grams.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {g: v / norm for g, v in vec.items()}
+
+    def _expire(self, now):
+        stale = [k for k, e in self._entries.items() if now - e["time"] > e["ttl"]]
+        for key in stale:
+            self._drop(key)
+
+    # ---------- public ----------
+    def get(self, query, namespace=""):
+        """Cached answer for ``query`` or a near-duplicate of it, else None."""
+        norm = normalize(query)
+        key = self._key(namespace, norm)
+        with self._lock:
+            self._expire(time.time())
+            if key not in self._entries:
+                key = self._nearest(namespace, norm)
+            if key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]["answer"]
+
+    def _nearest(self, namespace, norm):
+        grams = ngrams(norm)
+        prefix = self._key(namespace, "")
+        candidates = {k for g in grams for k in self._postings.get(g, ())
+                      if k.startswith(prefix)}
+        nums = numbers(norm)
+        query_vec = self._vector(grams)
+        best, best_score = None, self.threshold
+        for key in candidates:
+            if numbers(key[len(prefix):]) != nums:
+                continue
+            vec = self._vector(self._entries[key]["grams"])
+            score = sum(w * vec.get(g, 0.0) for g, w in query_vec.items())
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def put(self, query, answer, namespace="", ttl=None):
+        norm = normalize(query)
+        if not norm or not answer:
+            return
+        key = self._key(namespace, norm)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            grams = ngrams(norm)
+            self._entries[key] = {"answer": answer, "time": time.time(), "grams": grams,
+                                  "ttl": self.ttl if ttl is None else min(ttl, self.ttl)}
+            self._index(key, grams)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+            self._save()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / total, 3) if total else None}
+
+    # ---------- persistence ----------
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            rows = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for row in rows:
+            ttl = min(row.get("ttl", self.ttl), self.ttl)
+            if now - row["time"] > ttl:
+                continue
+            key = row["key"]
+            grams = ngrams(key.split("\x00", 1)[1])
+            self._entries[key] = {"answer": row["answer"], "time": row["time"], "grams": grams, "ttl": ttl}
+            self._index(key, grams)
+
+    def _save(self):
+        if not self.path:
+            return
+        rows = [{"key": k, "answer": e["answer"], "time": e["time"], "ttl": e["ttl"]}
+                for k, e in self._entries.items()]
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(rows, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
@@ -0,0 +1,248 @@
+"""Online per-bucket aggregation of vitals: a multi-resolution pyramid.
+
+Instead of ``df.groupby(df["time"].dt.floor(...)).mean()`` over the whole
+history on every rerun, each tier keeps running sum/count/min/max for the
+open bucket of every patient and moves it into a small ring of finalized
+buckets when a sample for a later bucket arrives.  Updates are O(1) per
+sample and vectorized across patients.
+
+The tiers form a pyramid over the raw store (10 s, 1 min, 10 min, 1 h), each
+ring long enough for the ranges it serves, so together they cover much more
+than the raw retention.  :meth:`RollupEngine.level_for` picks the finest tier
+that answers a time range in at most ``budget`` buckets and
+:meth:`RollupEngine.range` reads it, so zooming out to a day costs the same
+as the last few minutes.  Buckets older than anything seen since start can
+be loaded once per patient from the on-disk VitalsLog
+(:meth:`RollupEngine.backfill`).
+"""
+
+import numpy as np
+import pandas as pd
+
+from .store import VITALS
+
+TIERS = {"10s": 10, "1min": 60, "10min": 600, "1h": 3600}
+
+# Finalized buckets kept per patient and tier (1 h, 6 h, 2 days, 1 week).
+HISTORY = {"10s": 360, "1min": 360, "10min": 288, "1h": 168}
+
+_NS = 1_000_000_000
+
+
+def _aggregate(width, t, x):
+    """Buckets of sorted times ``t`` (ns) and samples ``x`` (n × vitals), as in :meth:`_Tier.rows`."""
+    bucket = t - t % width
+    first = np.flatnonzero(np.append(True, bucket[1:] != bucket[:-1]))
+    count = np.diff(np.append(first, len(t)))
+    return (bucket[first], count, np.add.reduceat(x, first), np.minimum.reduceat(x, first),
+            np.maximum.reduceat(x, first))
+
+
+class _Tier:
+    """Open bucket plus a ring of closed buckets for every slot."""
+
+    def __init__(self, seconds, history, slots):
+        self.width = np.int64(seconds * _NS)
+        self.history = history
+        self._alloc(slots)
+
+    def _alloc(self, slots, old=None):
+        nv = len(VITALS)
+        fresh = {
+            "start": np.full(slots, -1, dtype=np.int64),
+            "count": np.zeros(slots, dtype=np.int64),
+            "sum": np.zeros((slots, nv)),
+            "min": np.full((slots, nv), np.inf),
+            "max": np.full((slots, nv), -np.inf),
+            "closed": np.zeros(slots, dtype=np.int64),
+            "c_start": np.zeros((slots, self.history), dtype=np.int64),
+            "c_count": np.zeros((slots, self.history), dtype=np.int64),
+            "c_sum": np.zeros((slots, self.history, nv)),
+            "c_min": np.zeros((slots, self.history, nv)),
+            "c_max": np.zeros((slots, self.history, nv)),
+        }
+        if old is not None:
+            for name, arr in fresh.items():
+                arr[: len(old[name])] = old[name]
+        self.__dict__.update(fresh)
+        self._names = tuple(fresh)
+
+    @property
+    def slots(self):
+        return len(self.start)
+
+    def grow(self, slots):
+        self._alloc(slots, {name: getattr(self, name) for name in self._names})
+
+    def update(self, slots, t, x):
+        """Fold samples ``x`` (k × vitals) taken at ``t`` (ns) into ``slots``.
+
+        ``slots`` must not repeat within one call.
+        """
+        bucket = t - t % self.width
+        moved = self.start[slots] != bucket
+        done = slots[moved & (self.count[slots] > 0)]
+        if len(done):
+            pos = self.closed[done] % self.history
+            self.c_start[done, pos] = self.start[done]
+            self.c_count[done, pos] = self.count[done]
+            self.c_sum[done, pos] = self.sum[done]
+            self.c_min[done, pos] = self.min[done]
+            self.c_max[done, pos] = self.max[done]
+            self.closed[done] += 1
+        new = slots[moved]
+        if len(new):
+            self.start[new] = bucket[moved]
+            self.count[new] = 0
+            self.sum[new] = 0.0
+            self.min[new] = np.inf
+            self.max[new] = -np.inf
+        self.count[slots] += 1
+        self.sum[slots] += x
+        self.min[slots] = np.minimum(self.min[slots], x)
+        self.max[slots] = np.maximum(self.max[slots], x)
+
+    def rows(self, slot, n):
+        """Last ``n`` buckets of ``slot`` (closed ones, then the open one)."""
+        has_open = self.count[slot] > 0
+        n_closed = int(min(self.closed[slot], self.history, max(n - has_open, 0)))
+        idx = (self.closed[slot] - n_closed + np.arange(n_closed)) % self.history
+        start = self.c_start[slot, idx]
+        count = self.c_count[slot, idx]
+        total, lo, hi = self.c_sum[slot, idx], self.c_min[slot, idx], self.c_max[slot, idx]
+        if has_open:
+            start = np.append(start, self.start[slot])
+            count = np.append(count, self.count[slot])
+            total = np.vstack([total, self.sum[slot]])
+            lo = np.vstack([lo, self.min[slot]])
+            hi = np.vstack([hi, self.max[slot]])
+        return start, count, total, lo, hi
+
+    def prepend(self, slot, start, count, total, lo, hi):
+        """Put older buckets (oldest first, all before this slot's data) in front of ``slot``'s."""
+        closed = self.rows(slot, self.history + 1)
+        has_open = self.count[slot] > 0
+        parts = [np.asarray(a) for a in (start, count, total, lo, hi)]
+        if has_open or len(closed[0]):
+            # Merge a bucket split between the old data and ours.
+            if len(parts[0]) and parts[0][-1] == closed[0][0]:
+                c_count, c_total = closed[1].copy(), closed[2].copy()
+                c_lo, c_hi = closed[3].copy(), closed[4].copy()
+                c_count[0] += parts[1][-1]
+                c_total[0] += parts[2][-1]
+                c_lo[0] = np.minimum(c_lo[0], parts[3][-1])
+                c_hi[0] = np.maximum(c_hi[0], parts[4][-1])
+                closed = (closed[0], c_count, c_total, c_lo, c_hi)
+                parts = [a[:-1] for a in parts]
+            if has_open:
+                # ``rows`` appended the open bucket last; it stays open.
+                self.count[slot], self.sum[slot] = closed[1][-1], closed[2][-1]
+                self.min[slot], self.max[slot] = closed[3][-1], closed[4][-1]
+                closed = tuple(a[:-1] for a in closed)
+            parts = [np.concatenate([a, b]) for a, b in zip(parts, closed)]
+        elif len(parts[0]):
+            # Nothing of our own yet: the newest old bucket becomes the open one.
+            self.start[slot], self.count[slot] = parts[0][-1], parts[1][-1]
+            self.sum[slot], self.min[slot], self.max[slot] = parts[2][-1], parts[3][-1], parts[4][-1]
+            parts = [a[:-1] for a in parts]
+        parts = [a[-self.history:] for a in parts]
+        m = len(parts[0])
+        for name, arr in zip(("c_start", "c_count", "c_sum", "c_min", "c_max"), parts):
+            getattr(self, name)[slot, :m] = arr
+        self.closed[slot] = m
+
+
+class RollupEngine:
+    """Incremental per-bucket aggregates for every patient in a VitalsStore.
+
+    The engine subscribes to ``store`` so every appended sample updates all
+    tiers; reading a table costs O(rows requested), not O(history).
+    """
+
+    def __init__(self, store, tiers=tuple(TIERS), history=None):
+        history = {**HISTORY, **(history or {})}
+        self.store = store
+        self.tiers = {
+            name: _Tier(TIERS[name], history[name], max(len(store), 1))
+            for name in sorted(tiers, key=TIERS.get)
+        }
+        # Oldest time (ns) each slot's buckets cover; -1 before its first sample.
+        self._since = np.full(max(len(store), 1), -1, dtype=np.int64)
+        store.subscribe(self.update)
+
+    def _ensure(self, slot):
+        for tier in self.tiers.values():
+            if slot >= tier.slots:
+                tier.grow(max(2 * tier.slots, slot + 1))
+        if slot >= len(self._since):
+            since = np.full(max(2 * len(self._since), slot + 1), -1, dtype=np.int64)
+            since[: len(self._since)] = self._since
+            self._since = since
+
+    def update(self, slots, times, values):
+        x = np.column_stack([np.asarray(values[v], dtype=np.float64) for v in VITALS])
+        t = times.astype("datetime64[ns]").view(np.int64)
+        self._ensure(int(slots.max()))
+        self._since[slots] = np.where(self._since[slots] < 0, t, self._since[slots])
+        for tier in self.tiers.values():
+            tier.update(slots, t, x)
+
+    def level_for(self, span_ns, budget):
+        """Finest tier answering ``span_ns`` in at most ``budget`` buckets (else the coarsest)."""
+        for name, tier in self.tiers.items():
+            if span_ns <= budget * tier.width:
+                return name
+        return name
+
+    def backfill(self, pid, log, start_ns):
+        """Load ``pid``'s buckets from ``start_ns`` on out of a VitalsLog, once.
+
+        Only the part before the oldest sample seen here is read, and a
+        range already loaded is not read again.
+        """
+        slot = self.store.slot(pid)
+        self._ensure(slot)
+        since = int(self._since[slot])
+        if 0 <= since <= start_ns:
+            return 0
+        window = log.read(pid, start_ns, since if since >= 0 else None)
+        t = window["time"].view(np.int64)
+        if len(t):
+            x = np.column_stack([np.asarray(window[v], dtype=np.float64) for v in VITALS])
+            for tier in self.tiers.values():
+                tier.prepend(slot, *_aggregate(tier.width, t, x))
+        if since < 0 and not len(t):
+            return 0  # nothing anywhere yet; try again later
+        self._since[slot] = start_ns
+        return len(t)
+
+    def range(self, pid, tier, start_ns, end_ns=None, stats=("mean", "min", "max"), decimals=2):
+        """Buckets of ``tier`` overlapping ``[start_ns, end_ns)``, like :meth:`table`."""
+        t = self.tiers[tier]
+        frame = self.table(pid, tier, n=t.history + 1, stats=stats, decimals=decimals)
+        start = frame["start"].to_numpy().view(np.int64)
+        keep = start + t.width > start_ns
+        if end_ns is not None:
+            keep &= start < end_ns
+        return frame[keep].reset_index(drop=True)
+
+    def table(self, pid, tier="1min", n=10, stats=("mean",), decimals=2):
+        """Last ``n`` buckets for ``pid`` as a DataFrame, oldest first.
+
+        The first column is the bucket ``start``.  ``mean`` columns are named
+        after the vital, the others ``<vital>_<stat>``.
+        """
+        t = self.tiers[tier]
+        slot = self.store.slot(pid)
+        self._ensure(slot)
+        start, count, total, lo, hi = t.rows(slot, n)
+        data = {"start": start.astype("datetime64[ns]")}
+        for stat in stats:
+            if stat == "count":
+                data["count"] = count
+                continue
+            block = {"mean": total / np.maximum(count, 1)[:, None], "min": lo, "max": hi}[stat]
+            for i, vital in enumerate(VITALS):
+                name = vital if stat == "mean" else f"{vital}_{stat}"
+                data[name] = block[:, i].round(decimals)
+        return pd.DataFrame(data)
@@ -0,0 +1,352 @@
+"""Alert evaluation sharded over worker processes.
+
+One dashboard process evaluates alerts for its whole ward on the render
+side, on one core.  For a floor's worth of patients :class:`AlertPool`
+starts ``workers`` processes instead.  Each attaches to the ingestion
+service's shared-memory vitals segment (:mod:`.shm`), copies only the
+patients of its shard -- ``crc32(pid) % workers``, so every process agrees
+without talking to the others -- into a small local store with rollups and
+NEWS2 scoring, and after every new tick publishes, per patient, the alert
+level, the NEWS2 score and the current 1-minute means to a shared results
+table.  Readers (:class:`AlertResults`) attach to that table read-only.
+
+Patients added later (from the sidebar, a device, ...) land in their shard
+as soon as their first sample is in the segment.  :meth:`AlertPool.resize`
+changes the worker count: the new count is published in the table header,
+surplus workers exit, and each remaining worker re-partitions and picks up
+the history of the patients it gained from the segment ring.  Dead workers
+are restarted by :meth:`AlertPool.supervise`.
+
+Rows of the results table are indexed like the vitals segment's patient
+table.  Each row is written by exactly one worker; its fields are updated
+together but read without a lock, so a reader may see a row half way
+through one update (never a mix of two patients).  They belong to the
+vitals segment whose epoch is in the table header: when the ingestion
+service restarts with a new segment, the first worker to attach to it
+clears the table, and readers ignore rows of any other segment.
+
+::
+
+    python -m patient_monitor.shards --shm ward --workers 4
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+import zlib
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .alerts import AlertEngine
+from .news import NewsScorer
+from .rollup import RollupEngine
+from .shm import DEFAULT_SLOTS, ShmFeed, _attach
+from .shm import _CAPACITY as _VITALS_CAPACITY
+from .shm import _EPOCH as _VITALS_EPOCH
+from .shm import _SLOTS as _VITALS_SLOTS
+from .shm import _views as _vitals_views
+from .store import VITALS, VitalsStore
+from .vitals_db import DEFAULT_DB, VitalsDB
+
+log = logging.getLogger(__name__)
+
+MAGIC = 0x56495441_4C414C31  # "VITALAL1"
+
+# Header words.
+_MAGIC, _EPOCH, _WORKERS, _GENERATION, _SLOTS, _ROWS_EPOCH = range(6)
+_HEADER_WORDS = 8
+
+ROW = np.dtype([
+    ("level", np.int8),       # index into AlertEngine.names, -1 = not evaluated yet
+    ("news", np.int8),
+    ("worker", np.int16),
+    ("evaluated", np.int64),  # time (ns) of the newest sample evaluated
+    ("minute", np.float32, (len(VITALS),)),
+])
+
+
+def shard_of(pid, workers):
+    """Worker index owning ``pid`` (stable across processes and restarts)."""
+    return zlib.crc32(pid.encode()) % max(workers, 1)
+
+
+def _views(buf, slots):
+    header = np.ndarray((_HEADER_WORDS,), np.int64, buffer=buf)
+    rows = np.ndarray((slots,), ROW, buffer=buf, offset=_HEADER_WORDS * 8)
+    return header, rows
+
+
+def _size(slots):
+    return _HEADER_WORDS * 8 + ROW.itemsize * slots
+
+
+# ---------------- worker ----------------
+def _worker_main(index, vitals_shm, results_shm, db_path, history_s, interval):
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s shard-{index} %(levelname)s %(message)s")
+    shm = _attach(results_shm)
+    table_slots = int(np.ndarray((_HEADER_WORDS,), np.int64, buffer=shm.buf)[_SLOTS])
+    header, rows = _views(shm.buf, table_slots)
+    workers = int(header[_WORKERS])
+    generation = int(header[_GENERATION])
+
+    store = VitalsStore(retention_hours=history_s / 3600, sample_interval=1.0)
+    rollup = RollupEngine(store, tiers=("1min",))
+    news = NewsScorer(store)
+    engine = AlertEngine()
+    feed = ShmFeed(vitals_shm, store, select=lambda pid: shard_of(pid, workers) == index)
+    db = VitalsDB(db_path)
+    ages, ages_at = {}, 0.0
+    epoch = None
+    minute = rollup.tiers["1min"]
+
+    while True:
+        if int(header[_GENERATION]) != generation:
+            generation, workers = int(header[_GENERATION]), int(header[_WORKERS])
+            if index >= workers:
+                log.info("no longer needed (%d workers)", workers)
+                return
+            feed.reselect()
+        now = time.monotonic()
+        if now - ages_at > 1.0:
+            ages = {pid: info["age"] for pid, info in db.patients().items()}
+            ages_at = now
+        if not feed.poll():
+            time.sleep(interval)
+            continue
+        if feed.epoch != header[_ROWS_EPOCH]:
+            if feed.epoch == epoch:
+                continue  # another worker already moved on to a newer segment
+            # New vitals segment: its slots no longer match the rows.
+            rows["level"] = -1
+            header[_ROWS_EPOCH] = feed.epoch
+        epoch = feed.epoch
+
+        seg, pids = feed.selected()
+        have = np.array([store.total(p) > 0 for p in pids], dtype=bool)
+        seg, pids = seg[have], list(pids[have])
+        if not pids:
+            continue
+        age = np.array([np.nan if ages.get(p) is None else ages[p] for p in pids], dtype=float)
+        levels = engine.evaluate_arrays(store, pids, age)
+        scores = news.latest(pids)[0]
+        slots = np.fromiter((store.slot(p) for p in pids), dtype=np.intp, count=len(pids))
+        cols, _ = store.tail(1, pids)
+        level_index = {name: i for i, name in enumerate(engine.names)}
+
+        out = np.empty(len(pids), ROW)
+        out["level"] = [level_index[lv] for lv in levels]
+        out["news"] = scores
+        out["worker"] = index
+        out["evaluated"] = cols["time"][:, 0].view(np.int64)
+        out["minute"] = minute.sum[slots] / np.maximum(minute.count[slots], 1)[:, None]
+        keep = seg < table_slots
+        rows[seg[keep]] = out[keep]
+
+
+# ---------------- pool ----------------
+class AlertPool:
+    """Supervises the shard workers and owns the results table.
+
+    ``vitals_shm`` is the ingestion service's segment name; the results
+    table is created as ``<vitals_shm>_alerts`` with room for ``slots``
+    patients (the vitals segment's size).
+    """
+
+    def __init__(self, vitals_shm, db_path=DEFAULT_DB, workers=None, slots=DEFAULT_SLOTS, history_s=600,
+                 interval=0.01):
+        self.vitals_shm = vitals_shm
+        self.name = f"{vitals_shm}_alerts"
+        self.db_path = str(db_path)
+        self.history_s = history_s
+        self.interval = interval
+        self.slots = slots
+        try:
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=_size(slots))
+        self.header, self.rows = _views(self.shm.buf, slots)
+        self.header[:] = 0
+        self.rows["level"] = -1
+        self.header[_EPOCH] = secrets.randbits(62)
+        self.header[_SLOTS] = slots
+        self.header[_WORKERS] = workers or os.cpu_count() or 1
+        self.header[_MAGIC] = MAGIC
+        self.restarts = 0
+        self._ctx = multiprocessing.get_context("spawn")
+        self._procs = {}
+        self._lock = threading.Lock()
+        self._supervisor = None
+        self.supervise()
+
+    @property
+    def workers(self):
+        return int(self.header[_WORKERS])
+
+    def _start(self, index):
+        proc = self._ctx.Process(
+            target=_worker_main, name=f"alert-shard-{index}", daemon=True,
+            args=(index, self.vitals_shm, self.name, self.db_path, self.history_s, self.interval),
+        )
+        proc.start()
+        self._procs[index] = proc
+
+    def supervise(self):
+        """(Re)start missing workers and reap surplus ones; returns how many were started."""
+        started = 0
+        with self._lock:
+            for index in range(self.workers):
+                proc = self._procs.get(index)
+                if proc is None or not proc.is_alive():
+                    if proc is not None:
+                        self.restarts += 1
+                        log.warning("alert shard %d died (exit %s), restarting", index, proc.exitcode)
+                    self._start(index)
+                    started += 1
+            for index in [i for i in self._procs if i >= self.workers]:
+                if not self._procs[index].is_alive():
+                    del self._procs[index]
+        return started
+
+    def follow(self, interval=1.0):
+        """Call :meth:`supervise` on a daemon thread every ``interval`` seconds."""
+        if self._supervisor is not None:
+            return
+        def loop():
+            while True:
+                try:
+                    self.supervise()
+                except Exception:
+                    log.exception("alert pool supervision failed")
+                time.sleep(interval)
+        self._supervisor = threading.Thread(target=loop, name="alert-pool", daemon=True)
+        self._supervisor.start()
+
+    def resize(self, workers):
+        """Repartition over ``workers`` processes."""
+        with self._lock:
+            self.header[_WORKERS] = max(int(workers), 1)
+            self.header[_GENERATION] += 1
+        self.supervise()
+
+    def close(self):
+        for proc in self._procs.values():
+            proc.terminate()
+        for proc in self._procs.values():
+            proc.join(timeout=2)
+        self.header = self.rows = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+# ---------------- reader ----------------
+class AlertResults:
+    """Read-only view of a pool's results table, joined to the vitals segment's pids."""
+
+    def __init__(self, vitals_shm, engine=None):
+        self.vitals_shm = vitals_shm
+        self.name = f"{vitals_shm}_alerts"
+        self.names = (engine or AlertEngine()).names
+        self._shm = self._vitals = None
+        self._epochs = None
+
+    def _detach(self):
+        self._header = self._table = self._pids = None
+        for shm in (self._shm, self._vitals):
+            if shm is not None:
+                shm.close()
+        self._shm = self._vitals = None
+        self._epochs = None
+
+    def _rows(self):
+        # Either segment may have been recreated (pool or ingestion service
+        # restarted): look both up by name and re-attach when an epoch moved.
+        try:
+            shm, vitals = _attach(self.name), _attach(self.vitals_shm)
+        except FileNotFoundError:
+            self._detach()
+            return None, None
+        vitals_header = np.ndarray((8,), np.int64, buffer=vitals.buf)
+        header = np.ndarray((_HEADER_WORDS,), np.int64, buffer=shm.buf)
+        epochs = (int(header[_EPOCH]), int(vitals_header[_VITALS_EPOCH]))
+        if epochs == self._epochs:
+            del header, vitals_header
+            shm.close()
+            vitals.close()
+        else:
+            self._detach()
+            self._pids = _vitals_views(vitals.buf, int(vitals_header[_VITALS_SLOTS]),
+                                       int(vitals_header[_VITALS_CAPACITY]))["pids"]
+            self._header, self._table = _views(shm.buf, int(header[_SLOTS]))
+            del header, vitals_header
+            self._shm, self._vitals, self._epochs = shm, vitals, epochs
+        if self._header[_ROWS_EPOCH] != self._epochs[1]:
+            return self._table[:0].copy(), self._pids[:0].copy()  # not evaluated for this segment yet
+        n = min(len(self._table), len(self._pids))
+        return self._table[:n].copy(), self._pids[:n].copy()
+
+    def stamp(self):
+        """Changes whenever any worker published a newer evaluation."""
+        rows, _ = self._rows()
+        return 0 if rows is None else int(rows["evaluated"].max(initial=0))
+
+    def table(self):
+        """DataFrame of every evaluated patient: pid, level, NEWS, worker, evaluated, minute means."""
+        rows, pids = self._rows()
+        if rows is None:
+            return pd.DataFrame()
+        ok = rows["level"] >= 0
+        rows, pids = rows[ok], pids[ok]
+        data = {
+            "pid": [p.decode(errors="ignore") for p in pids],
+            "level": self.names[rows["level"]],
+            "NEWS": rows["news"],
+            "worker": rows["worker"],
+            "evaluated": rows["evaluated"].view("datetime64[ns]"),
+        }
+        for i, v in enumerate(VITALS):
+            data[v] = rows["minute"][:, i].astype(float).round(2)
+        return pd.DataFrame(data)
+
+    def levels(self):
+        """``{pid: (level, NEWS)}`` for every evaluated patient."""
+        t = self.table()
+        return {} if t.empty else dict(zip(t["pid"], zip(t["level"], t["NEWS"])))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded alert workers over a shared-memory vitals segment")
+    parser.add_argument("--shm", required=True, help="vitals segment of the ingestion service (--shm there)")
+    parser.add_argument("--db", default=str(DEFAULT_DB), help="shared SQLite file (patient ages)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--slots", type=int, default=DEFAULT_SLOTS, help="size of the vitals segment")
+    parser.add_argument("--every", type=float, default=5.0, help="seconds between summaries")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    pool = AlertPool(args.shm, args.db, workers=args.workers, slots=args.slots)
+    reader = AlertResults(args.shm)
+    try:
+        while True:
+            time.sleep(args.every)
+            pool.supervise()
+            table = reader.table()
+            if not table.empty:
+                print(f"{len(table)} patients | levels {table['level'].value_counts().to_dict()} "
+                      f"| per worker {table['worker'].value_counts().sort_index().to_dict()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
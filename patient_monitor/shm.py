@@ -0,0 +1,432 @@
+"""Shared-memory hand-off of vitals from the ingestion service to dashboards.
+
+Going through SQLite costs every dashboard process a query, a row-by-row
+decode and a Python tuple per sample on each poll.  With ``--shm NAME`` the
+ingestion service also writes each tick into a
+``multiprocessing.shared_memory`` segment laid out like the store: a fixed
+table of patient slots, one ring of ``capacity`` samples per slot and
+column, and a per-slot sample counter.  Dashboard processes attach with
+:class:`ShmFeed` and copy only the rows they have not seen yet straight
+into their VitalsStore, in one gather per column, addressing the store by
+slot number rather than by patient id.
+
+There is one writer and no lock.  The header holds a sequence counter the
+writer makes odd before touching the segment and even again afterwards (a
+seqlock): a reader notes the counter, copies, and retries if the counter was
+odd or has moved.  An unchanged counter means there is nothing to read, so
+polling is a single integer compare and can run every few milliseconds.
+Like any seqlock this relies on the writer's stores becoming visible in
+program order, which holds on x86 and is what the retry is there to catch
+elsewhere.
+
+Patients and their details still come from the database; only the vitals
+travel through the segment.  A reader that falls more than ``capacity``
+samples behind loses the overwritten ones (counted in ``dropped``).
+"""
+
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from .store import VITALS
+from .vitals_db import MAX_PID_BYTES
+
+log = logging.getLogger(__name__)
+
+MAGIC = 0x56495441_4C534D31  # "VITALSM1"
+PID_BYTES = MAX_PID_BYTES
+
+DEFAULT_SLOTS = int(os.getenv("VITALS_SHM_SLOTS", "1024"))
+DEFAULT_CAPACITY = int(os.getenv("VITALS_SHM_CAPACITY", "600"))
+
+# Header words.
+_MAGIC, _EPOCH, _SEQ, _SLOTS, _CAPACITY, _USED = range(6)
+_HEADER_WORDS = 8
+
+_DTYPES = {"t": np.int64, "HR": np.int16, "SpO2": np.int16, "BP": np.int16, "Temp": np.float32}
+
+
+def _layout(slots, capacity):
+    """``{name: (offset, dtype, shape)}`` and the total size in bytes."""
+    parts = [("header", np.int64, (_HEADER_WORDS,)), ("pids", f"S{PID_BYTES}", (slots,)),
+             ("count", np.int64, (slots,))]
+    parts += [(name, dtype, (slots, capacity)) for name, dtype in _DTYPES.items()]
+    layout, offset = {}, 0
+    for name, dtype, shape in parts:
+        layout[name] = (offset, np.dtype(dtype), shape)
+        offset += np.dtype(dtype).itemsize * int(np.prod(shape))
+        offset = (offset + 63) // 64 * 64
+    return layout, offset
+
+
+def _views(buf, slots, capacity):
+    layout, _ = _layout(slots, capacity)
+    return {name: np.ndarray(shape, dtype, buffer=buf, offset=offset)
+            for name, (offset, dtype, shape) in layout.items()}
+
+
+_untracked = threading.Lock()
+
+
+def _attach(name):
+    """Open an existing segment without handing it to a resource tracker.
+
+    Before 3.13 every attach registers the segment, and the tracker would
+    unlink it when the attaching process exits.  Unregistering afterwards is
+    no fix: child processes share their parent's tracker, so that would drop
+    the creator's own registration.  Registration is skipped instead.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    with _untracked:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class ShmWriter:
+    """Single writer of a vitals segment (the ingestion service).
+
+    Creates the segment ``name``, replacing a stale one left by a crashed
+    writer.  ``slots`` bounds the number of patients; samples of patients
+    beyond it are skipped with a warning (they still reach the database).
+    """
+
+    def __init__(self, name, slots=DEFAULT_SLOTS, capacity=DEFAULT_CAPACITY):
+        _, size = _layout(slots, capacity)
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self.name = name
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.capacity = capacity
+        self.slots = slots
+        self._v = _views(self.shm.buf, slots, capacity)
+        self._v["header"][:] = 0
+        self._v["count"][:] = 0
+        header = self._v["header"]
+        header[_EPOCH] = secrets.randbits(62)
+        header[_SLOTS], header[_CAPACITY] = slots, capacity
+        header[_MAGIC] = MAGIC
+        self._slot_of = {}
+        self._full_warned = False
+
+    def _slot(self, pid):
+        slot = self._slot_of.get(pid)
+        if slot is None:
+            if len(self._slot_of) >= self.slots:
+                if not self._full_warned:
+                    log.warning("shared-memory segment %s is full (%d patients)", self.name, self.slots)
+                    self._full_warned = True
+                return -1
+            raw = pid.encode()
+            if len(raw) > PID_BYTES:
+                log.warning("patient ID %r is too long for the shared-memory segment", pid)
+                return -1
+            slot = self._slot_of[pid] = len(self._slot_of)
+            self._v["pids"][slot] = raw
+        return slot
+
+    def write(self, rows):
+        """Publish ``(pid, t_ns, HR, SpO2, BP, Temp)`` rows (as for ``VitalsDB.insert_vitals``)."""
+        if not rows:
+            return
+        pids, t, *values = zip(*rows)
+        v, header = self._v, self._v["header"]
+        header[_SEQ] += 1  # odd: write in progress
+        try:
+            slots = np.fromiter((self._slot(p) for p in pids), dtype=np.intp, count=len(pids))
+            cols = {"t": np.array(t, dtype=np.int64),
+                    **{name: np.array(col, dtype=float) for name, col in zip(VITALS, values)}}
+            keep = slots >= 0
+            # A patient may appear more than once per tick (device samples):
+            # write in rounds so each round touches a slot at most once.
+            while keep.any():
+                first = np.zeros(len(slots), dtype=bool)
+                _, idx = np.unique(slots[keep], return_index=True)
+                first[np.flatnonzero(keep)[idx]] = True
+                s = slots[first]
+                pos = v["count"][s] % self.capacity
+                for name, col in cols.items():
+                    v[name][s, pos] = col[first]
+                v["count"][s] += 1
+                keep &= ~first
+            header[_USED] = len(self._slot_of)
+        finally:
+            header[_SEQ] += 1  # even: consistent again
+
+    def close(self, unlink=True):
+        self._v = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class ShmFeed:
+    """Copies new samples from a vitals segment into a VitalsStore.
+
+    Drop-in for :class:`~patient_monitor.vitals_db.VitalsFeed`: call
+    :meth:`poll` as often as you like.  The segment may appear (or be
+    recreated by a restarted writer) at any time; the feed attaches lazily,
+    re-attaches when the writer's epoch changes and detaches once the
+    segment is gone.  Segment memory is only ever read.
+
+    ``select(pid)`` restricts the feed to some patients (e.g. one alerting
+    shard); call :meth:`reselect` after its answer changed.
+    """
+
+    def __init__(self, name, store, retries=100, reattach_after=2.0, select=None):
+        self.name = name
+        self.store = store
+        self.select = select
+        self.retries = retries
+        self.reattach_after = reattach_after
+        self.dropped = 0
+        self.torn = 0
+        self._shm = None
+        self._v = None
+        self._epoch = None
+        self._seq = -1
+        self._seen = np.zeros(0, dtype=np.int64)
+        self._names = np.empty(0, dtype=object)
+        self._slots = np.empty(0, dtype=np.intp)
+        self._fresh = False
+        self._last_change = time.monotonic()
+
+    @property
+    def attached(self):
+        return self._v is not None
+
+    @property
+    def epoch(self):
+        """Epoch of the attached segment (None before the first attach)."""
+        return self._epoch
+
+    # ---------- attaching ----------
+    def _open(self):
+        try:
+            shm = _attach(self.name)
+        except FileNotFoundError:
+            self._detach()  # writer gone: stop reporting a dead segment as attached
+            return False
+        header = np.ndarray((_HEADER_WORDS,), np.int64, buffer=shm.buf)
+        if header[_MAGIC] != MAGIC:  # a new writer still initialising
+            del header
+            shm.close()
+            self._detach()
+            return False
+        slots, capacity, epoch = int(header[_SLOTS]), int(header[_CAPACITY]), int(header[_EPOCH])
+        del header
+        if epoch == self._epoch:
+            shm.close()
+            return True
+        self._detach()
+        views = _views(shm.buf, slots, capacity)
+        for view in views.values():
+            view.flags.writeable = False
+        self._shm, self._v, self._epoch = shm, views, epoch
+        self._capacity = capacity
+        self._seq = -1
+        self._seen = np.zeros(slots, dtype=np.int64)
+        self._names = np.empty(0, dtype=object)
+        self._slots = np.empty(0, dtype=np.intp)
+        self._fresh = True
+        return True
+
+    def _detach(self):
+        if self._shm is not None:
+            self._v = None
+            self._shm.close()
+            self._shm = None
+            self._epoch = None
+
+    def close(self):
+        self._detach()
+
+    # ---------- reading ----------
+    def poll(self):
+        """Append every unseen sample to the store; returns how many were read."""
+        now = time.monotonic()
+        if self._v is None or now - self._last_change > self.reattach_after:
+            self._last_change = now
+            if not self._open():
+                return 0
+        header = self._v["header"]
+        if header[_SEQ] == self._seq:
+            return 0
+        self._last_change = now
+        for _ in range(self.retries):
+            seq = int(header[_SEQ])
+            if seq & 1:
+                continue
+            snapshot = self._read()
+            if int(header[_SEQ]) == seq:
+                self._seq = seq
+                return self._apply(*snapshot)
+            self.torn += 1
+        return 0
+
+    def _read(self):
+        """Copy the unseen rows; only valid if the sequence did not move meanwhile."""
+        v, cap = self._v, self._capacity
+        used = int(v["header"][_USED])
+        count = v["count"][:used].copy()
+        new = count - self._seen[:used]
+        behind = np.maximum(new - cap, 0)
+        new -= behind
+        slot = np.repeat(np.arange(used), new)
+        # k-th unseen sample of its slot, oldest first.
+        k = np.arange(len(slot)) - np.repeat(np.cumsum(new) - new, new)
+        pos = (np.repeat(count - new, new) + k) % cap
+        cols = {name: v[name][slot, pos] for name in _DTYPES}
+        # Slots are only ever added, so only the new part of the table is copied.
+        pids = v["pids"][len(self._names):used].copy()
+        return used, count, behind, slot, k, pids, cols
+
+    def _apply(self, used, count, behind, slot, k, pids, cols):
+        self._seen[:used] = count
+        self.dropped += int(behind.sum())
+        if not len(slot):
+            return 0
+        if len(pids):
+            new_names = [p.decode(errors="ignore") for p in pids]
+            self._names = np.concatenate([self._names, new_names])
+            self._slots = np.concatenate([self._slots, [self._store_slot(p) for p in new_names]])
+        names = self._names
+        if self.select is not None:
+            sel = self._slots[slot] >= 0
+            slot, k = slot[sel], k[sel]
+            cols = {name: col[sel] for name, col in cols.items()}
+            if not len(slot):
+                return 0
+        if self._fresh:
+            # First read after attaching: the ring overlaps what the store
+            # already got elsewhere (e.g. the database backfill).
+            self._fresh = False
+            last = np.array([self._last_time(p) for p in names], dtype=np.int64)
+            sel = cols["t"] > last[slot]
+            # Times rise within a slot, so whole prefixes go; renumber the rest.
+            skipped = np.bincount(slot[~sel], minlength=used)
+            slot, k = slot[sel], k[sel] - skipped[slot[sel]]
+            cols = {name: col[sel] for name, col in cols.items()}
+            if not len(slot):
+                return 0
+        # One append_batch per round of distinct patients, in time order.
+        for r in range(int(k.max()) + 1):
+            sel = k == r
+            self.store.append_slots(
+                self._slots[slot[sel]], cols["t"][sel].view("datetime64[ns]"),
+                **{name: cols[name][sel] for name in VITALS}
+            )
+        return len(slot)
+
+    def _store_slot(self, pid):
+        if self.select is None or self.select(pid):
+            return self.store.add_patient(pid)
+        return -1
+
+    def selected(self):
+        """``(segment_slots, pids)`` of the patients this feed copies."""
+        seg = np.flatnonzero(self._slots >= 0)
+        return seg, self._names[seg]
+
+    def reselect(self):
+        """Re-apply ``select``; newly selected patients get the segment's retained history."""
+        if self._v is None:
+            return
+        slots = np.array([self._store_slot(p) for p in self._names], dtype=np.intp)
+        gained = np.flatnonzero((slots >= 0) & (self._slots < 0))
+        self._slots = slots
+        if len(gained):
+            # Re-read their ring; the timestamp check skips what the store still has.
+            count = self._v["count"][gained]
+            self._seen[gained] = np.maximum(count - self._capacity, 0)
+            self._seq = -1
+            self._fresh = True
+
+    def _last_time(self, pid):
+        if pid not in self.store or not self.store.total(pid):
+            return np.iinfo(np.int64).min
+        return int(self.store.window(pid, 1)["time"][0].view(np.int64))
+
+
+# ---------------- latency check ----------------
+def _produce(name, patients, hz, seconds):
+    from .simulator import WardSimulator
+    from .vitals_db import now_ns
+
+    sim = WardSimulator(hz=hz, seed=0)
+    pids = [f"SHM{i:05d}" for i in range(patients)]
+    sim.add(pids)
+    writer = ShmWriter(name, slots=max(patients, 1))
+    period = 1.0 / hz
+    next_tick = time.monotonic() + 0.5
+    try:
+        for _ in range(int(seconds * hz)):
+            time.sleep(max(next_tick - time.monotonic(), 0))
+            values = sim.step()
+            writer.write(list(zip(pids, [now_ns()] * patients, *(values[v].tolist() for v in VITALS))))
+            next_tick += period
+        time.sleep(0.5)
+    finally:
+        writer.close()
+
+
+def main(argv=None):
+    """Measure writer-to-store latency across processes."""
+    import argparse
+    import multiprocessing
+
+    from .store import VitalsStore
+    from .vitals_db import now_ns
+
+    parser = argparse.ArgumentParser(description="Shared-memory vitals transport latency")
+    parser.add_argument("--patients", type=int, default=500)
+    parser.add_argument("--hz", type=float, default=10.0)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    name = f"vitals_bench_{os.getpid()}"
+    producer = multiprocessing.Process(target=_produce, args=(name, args.patients, args.hz, args.seconds))
+    producer.start()
+    store = VitalsStore(retention_hours=args.seconds / 3600 + 0.01, sample_interval=1 / args.hz)
+    feed = ShmFeed(name, store)
+    latency, poll_us, idle_us = [], [], []
+    deadline = time.monotonic() + args.seconds + 2.0
+    while time.monotonic() < deadline and producer.is_alive():
+        started = time.perf_counter()
+        rows = feed.poll()
+        took = (time.perf_counter() - started) * 1e6
+        if rows:
+            latency.append((now_ns() - store.window(store.pids[-1], 1)["time"][0].view(np.int64)) / 1e3)
+            poll_us.append(took)
+        elif feed.attached:
+            idle_us.append(took)
+    producer.join()
+    feed.close()
+
+    def fmt(xs):
+        xs = np.asarray(xs)
+        return f"p50 {np.percentile(xs, 50):,.1f} µs, p99 {np.percentile(xs, 99):,.1f} µs" if len(xs) else "n/a"
+
+    print(f"{args.patients} patients at {args.hz:g} Hz, {len(latency)} ticks read "
+          f"(torn retries {feed.torn}, dropped {feed.dropped})")
+    print(f"write → store latency : {fmt(latency)}")
+    print(f"poll with a new tick  : {fmt(poll_us)}")
+    print(f"poll with nothing new : {fmt(idle_us)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Seeded, vectorized vitals simulator and ward load generator.
+
+``generate_vitals()`` drew four independent uniform numbers per sample, so
+the charts were noise and the alert levels flickered at random.
+:class:`WardSimulator` instead keeps a physiological state per patient:
+
+* every vital follows a mean-reverting (Ornstein-Uhlenbeck) walk around the
+  patient's own baseline, so trajectories drift smoothly;
+* the random kicks are correlated across vitals (fever raises HR, tachycardia
+  comes with lower SpO2, ...);
+* scripted deteriorations ramp the baseline towards a septic picture, which
+  reliably ends in RED, so the alerting path can be exercised on purpose.
+
+All patients advance together as NumPy arrays and the same ``seed`` always
+gives the same ward.  As a load generator::
+
+    python -m patient_monitor.simulator --patients 2000 --hz 5 --seconds 60
+    python -m patient_monitor.simulator --patients 200 --db vitals.db   # feed the dashboards
+
+The first form drives the dashboards' in-process data path (store, rollups,
+alerts, ward overview) as fast as it can and reports timings; the second
+writes to the shared database in real time, like the ingestion service.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from .store import VITALS
+
+# Baseline distribution across patients (mean, std).
+BASELINE = {"HR": (78.0, 8.0), "SpO2": (97.0, 1.0), "BP": (118.0, 7.0), "Temp": (36.8, 0.2)}
+
+# Stationary spread of each vital around the baseline.
+SPREAD = np.array([5.0, 1.0, 5.0, 0.15])
+
+# Correlation of the random kicks, in VITALS order.
+CORRELATION = np.array([
+    [1.0, -0.4, 0.3, 0.4],
+    [-0.4, 1.0, -0.1, -0.2],
+    [0.3, -0.1, 1.0, 0.1],
+    [0.4, -0.2, 0.1, 1.0],
+])
+
+# Physiologically possible range, in VITALS order.
+LIMITS = np.array([[30, 60, 60, 34.0], [220, 100, 220, 42.0]])
+
+# Baseline shift reached at the end of a scripted deterioration.
+SEPSIS = {"HR": 45.0, "SpO2": -10.0, "BP": -25.0, "Temp": 2.0}
+
+# Seconds over which a vital forgets a disturbance (mean-reversion time).
+REVERSION = 300.0
+
+
+class WardSimulator:
+    """Correlated vital trajectories for many virtual patients.
+
+    ``deteriorate`` is the fraction of patients added later that get a
+    deterioration starting at a random time within ``horizon`` seconds.
+    """
+
+    def __init__(self, hz=1.0, seed=None, deteriorate=0.0, horizon=3600.0):
+        self.dt = 1.0 / hz
+        self.rng = np.random.default_rng(seed)
+        self.deteriorate = deteriorate
+        self.horizon = horizon
+        self.elapsed = 0.0
+        self._index = {}
+        self._pids = []
+        nv = len(VITALS)
+        self.ages = np.empty(0)
+        self.baseline = np.empty((0, nv))
+        self.state = np.empty((0, nv))
+        self.event_start = np.empty(0)
+        self.event_ramp = np.empty(0)
+        self.event_shift = np.empty((0, nv))
+        self._chol = np.linalg.cholesky(CORRELATION)
+        theta = 1.0 / REVERSION
+        self._pull = theta * self.dt
+        self._kick = SPREAD * np.sqrt(2 * theta * self.dt)
+
+    def __contains__(self, pid):
+        return pid in self._index
+
+    def __len__(self):
+        return len(self._pids)
+
+    @property
+    def pids(self):
+        return list(self._pids)
+
+    def add(self, pids, ages=None):
+        """Add patients (ages drawn at random where missing); returns their ages."""
+        # Skip known (and repeated) pids together with their ages.
+        new = {}
+        for pid, age in zip(pids, [None] * len(pids) if ages is None else ages):
+            if pid not in self._index:
+                new.setdefault(pid, age)
+        pids = list(new)
+        n = len(pids)
+        if not n:
+            return np.empty(0)
+        rng = self.rng
+        drawn = rng.integers(1, 95, n).astype(float)
+        given = np.array([np.nan if a is None else a for a in new.values()], dtype=float)
+        ages = np.where(np.isnan(given), drawn, given)
+
+        mean = np.array([BASELINE[v][0] for v in VITALS])
+        std = np.array([BASELINE[v][1] for v in VITALS])
+        base = mean + std * rng.standard_normal((n, len(VITALS)))
+        base[:, 0] += np.where(ages <= 12, 15.0, 0.0)  # children run faster
+        base = np.clip(base, LIMITS[0], [200, 99.0, 200, 41.0])
+
+        start = np.full(n, np.inf)
+        sick = rng.random(n) < self.deteriorate
+        start[sick] = self.elapsed + rng.uniform(0, self.horizon, sick.sum())
+
+        for pid in pids:
+            self._index[pid] = len(self._pids)
+            self._pids.append(pid)
+        self.ages = np.concatenate([self.ages, ages])
+        self.baseline = np.vstack([self.baseline, base])
+        self.state = np.vstack([self.state, base])
+        self.event_start = np.concatenate([self.event_start, start])
+        self.event_ramp = np.concatenate([self.event_ramp, np.full(n, 600.0)])
+        self.event_shift = np.vstack([self.event_shift, np.tile([SEPSIS[v] for v in VITALS], (n, 1))])
+        return ages
+
+    def deteriorate_at(self, pid, start, ramp=600.0, shift=SEPSIS):
+        """Script a deterioration of ``pid`` beginning ``start`` seconds from now."""
+        i = self._index[pid]
+        self.event_start[i] = self.elapsed + start
+        self.event_ramp[i] = ramp
+        self.event_shift[i] = [shift.get(v, 0.0) for v in VITALS]
+
+    def _target(self):
+        progress = np.clip((self.elapsed - self.event_start) / self.event_ramp, 0.0, 1.0)
+        return self.baseline + progress[:, None] * self.event_shift
+
+    def step(self, pids=None):
+        """Advance every patient by one tick; ``{vital: array}`` for ``pids``.
+
+        HR, SpO2 and BP come out as integers and Temp with one decimal, like
+        a bedside monitor.
+        """
+        self.elapsed += self.dt
+        z = self.rng.standard_normal(self.state.shape) @ self._chol.T
+        self.state += self._pull * (self._target() - self.state) + self._kick * z
+        np.clip(self.state, LIMITS[0], LIMITS[1], out=self.state)
+        if pids is None:
+            rows = self.state
+        else:
+            rows = self.state[np.fromiter((self._index[p] for p in pids), dtype=np.intp, count=len(pids))]
+        out = {v: np.rint(rows[:, i]).astype(np.int16) for i, v in enumerate(VITALS[:3])}
+        out["Temp"] = np.round(rows[:, 3], 1).astype(np.float32)
+        return out
+
+
+# ---------------- load generator ----------------
+def _percentiles(ms):
+    ms = np.asarray(ms)
+    return f"mean {ms.mean():.2f} ms, p95 {np.percentile(ms, 95):.2f} ms" if len(ms) else "n/a"
+
+
+def run_in_process(patients, hz, seconds, seed, deteriorate, alert_every=1.0):
+    """Push ``seconds`` of simulated data through registry, alerts and ward view."""
+    from .alerts import AlertEngine
+    from .registry import PatientRegistry
+    from .vitals_db import now_ns
+    from .ward import ward_snapshot
+
+    sim = WardSimulator(hz=hz, seed=seed, deteriorate=deteriorate, horizon=seconds / 2)
+    pids = [f"SIM{i:05d}" for i in range(patients)]
+    ages = sim.add(pids)
+    registry = PatientRegistry(None, retention_hours=max(seconds / 3600, 0.1), sample_interval=1 / hz)
+    for pid, age in zip(pids, ages):
+        registry.add_patient(pid, pid, int(age), "")
+    engine = AlertEngine()
+
+    t0 = np.datetime64(now_ns(), "ns")
+    step_ns = int(1e9 / hz)
+    ticks = int(seconds * hz)
+    every = max(1, int(alert_every * hz))
+    append_ms, alert_ms = [], []
+    levels = None
+    for k in range(ticks):
+        values = sim.step()
+        started = time.perf_counter()
+        registry.append_batch(pids, t0 + np.timedelta64(k * step_ns, "ns"), **values)
+        append_ms.append((time.perf_counter() - started) * 1e3)
+        if k % every == every - 1:
+            started = time.perf_counter()
+            with registry.reading():
+                levels = engine.evaluate_arrays(registry.store, pids, ages)
+            alert_ms.append((time.perf_counter() - started) * 1e3)
+
+    started = time.perf_counter()
+    ward_snapshot(registry, engine)
+    ward_ms = (time.perf_counter() - started) * 1e3
+
+    total = sum(append_ms) / 1e3
+    print(f"{patients} patients × {ticks} ticks = {patients * ticks} samples")
+    print(f"append_batch : {_percentiles(append_ms)}  ({patients * ticks / total:,.0f} samples/s)")
+    print(f"alerts       : {_percentiles(alert_ms)}")
+    print(f"ward snapshot: {ward_ms:.2f} ms")
+    if levels is not None:
+        names, counts = np.unique(levels, return_counts=True)
+        scripted = int((sim.event_start < sim.elapsed).sum())
+        print("levels       :", dict(zip(names.tolist(), counts.tolist())), f"(deteriorating: {scripted})")
+
+
+def run_into_db(db, patients, hz, seconds, seed, deteriorate):
+    """Write simulated samples into a VitalsDB in real time (dashboard feed)."""
+    from .vitals_db import now_ns
+
+    sim = WardSimulator(hz=hz, seed=seed, deteriorate=deteriorate, horizon=seconds or 3600.0)
+    pids = [f"SIM{i:05d}" for i in range(patients)]
+    ages = sim.add(pids)
+    for pid, age in zip(pids, ages):
+        db.add_patient(pid, pid, int(age), "")
+
+    period = 1.0 / hz
+    next_tick = time.monotonic()
+    end = next_tick + seconds if seconds else float("inf")
+    while time.monotonic() < end:
+        values = sim.step()
+        t = now_ns()
+        db.insert_vitals(list(zip(pids, [t] * patients, *(values[v].tolist() for v in VITALS))))
+        next_tick += period
+        time.sleep(max(next_tick - time.monotonic(), 0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vitals simulator / load generator")
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--hz", type=float, default=1.0, help="samples per second per patient")
+    parser.add_argument("--seconds", type=float, default=600.0, help="simulated duration (0 = forever with --db)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--deteriorate", type=float, default=0.05, help="fraction of patients that deteriorate")
+    parser.add_argument("--db", help="write to this VitalsDB in real time instead of benchmarking in-process")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        from .vitals_db import VitalsDB
+        try:
+            run_into_db(VitalsDB(args.db), args.patients, args.hz, args.seconds, args.seed, args.deteriorate)
+        except KeyboardInterrupt:
+            pass
+    else:
+        run_in_process(args.patients, args.hz, args.seconds, args.seed, args.deteriorate)
+
+
+if __name__ == "__main__":
+    main()
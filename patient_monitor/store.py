@@ -0,0 +1,246 @@
+"""Columnar ring-buffer storage for patient vitals.
+
+Every patient owns one row ("slot") in a set of 2-D NumPy columns, one column
+per vital.  Each row is a ring buffer of ``capacity`` samples that is written
+twice (at ``i`` and ``i + capacity``), so the newest ``n`` samples are always a
+contiguous slice and can be handed to pandas / charts without copying.
+
+Derived views (rollups, alert state, ...) subscribe to appends instead of
+re-scanning the history on every rerun; see :meth:`VitalsStore.subscribe`.
+Views that keep one value per sample (NEWS2 scores, anomaly flags) keep it
+in a ring the store owns and indexes like its own columns; see
+:meth:`VitalsStore.add_ring`.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+VITALS = ("HR", "SpO2", "BP", "Temp")
+
+COLUMNS = {
+    "time": np.dtype("datetime64[ns]"),
+    "HR": np.dtype(np.int16),
+    "SpO2": np.dtype(np.int16),
+    "BP": np.dtype(np.int16),
+    "Temp": np.dtype(np.float32),
+}
+
+
+def capacity_for(retention_hours, sample_interval):
+    """Number of samples needed to keep ``retention_hours`` of history."""
+    return max(1, int(math.ceil(retention_hours * 3600.0 / sample_interval)))
+
+
+class VitalsStore:
+    """Fixed-retention vitals history for many patients.
+
+    ``retention_hours`` and ``sample_interval`` (seconds) decide the ring
+    capacity.  Appends are O(1); windows are zero-copy views that stay valid
+    until the ring wraps over them.
+    """
+
+    def __init__(self, retention_hours=1.0, sample_interval=1.0, slots=16):
+        self.retention_hours = retention_hours
+        self.sample_interval = sample_interval
+        self.capacity = capacity_for(retention_hours, sample_interval)
+        self._slot_of = {}
+        self._pids = []
+        self._listeners = []
+        self._rings = {}
+        self._count = np.zeros(slots, dtype=np.int64)
+        self._cols = {
+            name: np.zeros((slots, 2 * self.capacity), dtype=dtype)
+            for name, dtype in COLUMNS.items()
+        }
+
+    # ---------- patients ----------
+    def __contains__(self, pid):
+        return pid in self._slot_of
+
+    def __len__(self):
+        return len(self._pids)
+
+    @property
+    def pids(self):
+        return list(self._pids)
+
+    def slot(self, pid):
+        return self._slot_of[pid]
+
+    def add_patient(self, pid):
+        """Reserve a slot for ``pid`` (no-op if it already has one)."""
+        if pid in self._slot_of:
+            return self._slot_of[pid]
+        slot = len(self._pids)
+        if slot == len(self._count):
+            self._grow(2 * slot)
+        self._slot_of[pid] = slot
+        self._pids.append(pid)
+        return slot
+
+    def _grow(self, slots):
+        count = np.zeros(slots, dtype=np.int64)
+        count[: len(self._count)] = self._count
+        self._count = count
+        for cols in (self._cols, self._rings):
+            for name, col in cols.items():
+                grown = np.zeros((slots, col.shape[1]), dtype=col.dtype)
+                grown[: col.shape[0]] = col
+                cols[name] = grown
+
+    # ---------- writes ----------
+    def subscribe(self, listener):
+        """Call ``listener(slots, times, values)`` after every append.
+
+        ``slots`` and ``times`` are 1-D arrays and ``values`` maps each name in
+        :data:`VITALS` to a 1-D array, so listeners are written once for both
+        single samples and ward-wide batches.
+        """
+        self._listeners.append(listener)
+
+    def append(self, pid, time, HR, SpO2, BP, Temp):
+        """Append one sample for ``pid``, registering the patient if needed."""
+        slot = self.add_patient(pid)
+        pos = self._count[slot] % self.capacity
+        cols = self._cols
+        row = {"time": np.datetime64(time, "ns"), "HR": HR, "SpO2": SpO2,
+               "BP": BP, "Temp": Temp}
+        for name, value in row.items():
+            col = cols[name][slot]
+            col[pos] = value
+            col[pos + self.capacity] = value
+        self._count[slot] += 1
+        if self._listeners:
+            slots = np.array([slot])
+            times = cols["time"][slot, pos:pos + 1]
+            values = {name: cols[name][slot, pos:pos + 1] for name in VITALS}
+            for listener in self._listeners:
+                listener(slots, times, values)
+
+    def append_batch(self, pids, time, HR, SpO2, BP, Temp):
+        """Append one sample for each of ``pids`` in a single vectorized write.
+
+        ``pids`` must not repeat; ``time`` is one timestamp for all or one
+        per patient, the vitals are arrays aligned with ``pids``.  Listeners
+        are called once for the whole batch.
+        """
+        if not len(pids):
+            return
+        slots = np.fromiter((self.add_patient(p) for p in pids), dtype=np.intp, count=len(pids))
+        self.append_slots(slots, time, HR, SpO2, BP, Temp)
+
+    def append_slots(self, slots, time, HR, SpO2, BP, Temp):
+        """:meth:`append_batch` for callers that already hold the slot numbers.
+
+        Skips the per-patient id lookup, which dominates large batches.
+        """
+        pos = self._count[slots] % self.capacity
+        cols = self._cols
+        row = {"time": np.asarray(time, dtype="datetime64[ns]"), "HR": HR, "SpO2": SpO2,
+               "BP": BP, "Temp": Temp}
+        for name, value in row.items():
+            col = cols[name]
+            col[slots, pos] = value
+            col[slots, pos + self.capacity] = value
+        self._count[slots] += 1
+        if self._listeners:
+            times = cols["time"][slots, pos]
+            values = {name: cols[name][slots, pos] for name in VITALS}
+            for listener in self._listeners:
+                listener(slots, times, values)
+
+    # ---------- reads ----------
+    def size(self, pid):
+        """Samples currently retained for ``pid``."""
+        return int(min(self._count[self._slot_of[pid]], self.capacity))
+
+    def total(self, pid):
+        """Samples ever appended for ``pid`` (including evicted ones)."""
+        return int(self._count[self._slot_of[pid]])
+
+    def _bounds(self, slot, n):
+        count = self._count[slot]
+        n = min(count, self.capacity) if n is None else min(n, count, self.capacity)
+        stop = (count - 1) % self.capacity + self.capacity + 1 if count else 0
+        return stop - n, stop
+
+    def window(self, pid, n=None):
+        """Oldest-first views of the last ``n`` samples (all retained if None)."""
+        slot = self._slot_of[pid]
+        start, stop = self._bounds(slot, n)
+        return {name: col[slot, start:stop] for name, col in self._cols.items()}
+
+    def latest(self, pid):
+        """Newest sample as a plain dict, or ``None`` if there is none yet."""
+        if not self.total(pid):
+            return None
+        last = self.window(pid, 1)
+        row = {name: last[name][0].item() for name in VITALS}
+        row["Temp"] = round(row["Temp"], 2)  # drop float32 widening noise
+        row["time"] = pd.Timestamp(last["time"][0])
+        return row
+
+    def tail(self, n, pids=None):
+        """Last ``n`` samples of many patients as ``(patients, n)`` arrays.
+
+        Returns ``(columns, valid)`` where ``valid[i]`` is how many of the
+        right-most entries in row ``i`` are real samples; the rest are left
+        over from an empty ring and must be masked by the caller.  This is a
+        single fancy-indexing gather per column, not a loop over patients.
+        """
+        pids = self._pids if pids is None else pids
+        slots = np.fromiter((self._slot_of[p] for p in pids), dtype=np.intp, count=len(pids))
+        n = min(n, self.capacity)
+        count = self._count[slots]
+        stop = np.where(count > 0, (count - 1) % self.capacity + self.capacity + 1, n)
+        idx = stop[:, None] - n + np.arange(n)
+        columns = {name: col[slots[:, None], idx] for name, col in self._cols.items()}
+        return columns, np.minimum(count, n)
+
+    def frame(self, pid, n=None):
+        """DataFrame over the last ``n`` samples, backed by the ring views."""
+        return pd.DataFrame(self.window(pid, n), copy=False)
+
+    # ---------- aligned rings ----------
+    def add_ring(self, name, dtype):
+        """Add a per-sample column ``name`` for a derived view.
+
+        It is laid out and grown like the vitals columns but never written by
+        the store: a listener fills it with :meth:`put_ring`, and
+        :meth:`ring_window` / :meth:`ring_latest` line up with :meth:`window`
+        and :meth:`latest`.  Samples appended before it was added read as 0;
+        adding an existing ring again keeps it.
+        """
+        if name not in self._rings:
+            self._rings[name] = np.zeros((len(self._count), 2 * self.capacity), dtype=dtype)
+
+    def put_ring(self, slots, **values):
+        """Store ``ring=values`` for the samples just appended to ``slots`` (call from a listener)."""
+        pos = (self._count[slots] - 1) % self.capacity
+        for name, value in values.items():
+            col = self._rings[name]
+            col[slots, pos] = value
+            col[slots, pos + self.capacity] = value
+
+    def ring_window(self, name, pid, n=None):
+        """Oldest-first view of the last ``n`` values of ring ``name`` for ``pid``."""
+        slot = self._slot_of[pid]
+        start, stop = self._bounds(slot, n)
+        return self._rings[name][slot, start:stop]
+
+    def ring_latest(self, slots, *names):
+        """``({name: values}, has_data)`` at the newest sample of each of ``slots``.
+
+        One gather per ring; values of slots without samples are 0.
+        """
+        slots = np.asarray(slots, dtype=np.intp)
+        count = self._count[slots]
+        has = count > 0
+        pos = np.where(has, (count - 1) % self.capacity, 0)
+        values = {}
+        for name in names:
+            col = self._rings[name]
+            values[name] = np.where(has, col[slots, pos], col.dtype.type(0))
+        return values, has
@@ -0,0 +1,216 @@
+"""SQLite hand-off between the ingestion service and the dashboards.
+
+The ingestion process is the only writer of vitals; dashboards register
+patients and read new rows incrementally by row id.  WAL mode lets both sides
+work concurrently.  Times are stored as int64 nanoseconds of local wall time,
+the same representation as :class:`~patient_monitor.store.VitalsStore`.
+"""
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .store import VITALS
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DB = Path(os.getenv("VITALS_DB") or Path(__file__).resolve().parent.parent / "vitals.db")
+
+# Longest patient ID in UTF-8 bytes (the shared-memory segment's pid field).
+MAX_PID_BYTES = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    pid TEXT PRIMARY KEY,
+    name TEXT,
+    age INTEGER,
+    gender TEXT,
+    added REAL
+);
+CREATE TABLE IF NOT EXISTS vitals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pid TEXT NOT NULL,
+    t INTEGER NOT NULL,
+    HR INTEGER,
+    SpO2 INTEGER,
+    BP INTEGER,
+    Temp REAL
+);
+CREATE INDEX IF NOT EXISTS vitals_t ON vitals (t);
+"""
+
+
+def check_pid(pid):
+    """Raise ValueError unless ``pid`` fits in ``MAX_PID_BYTES``."""
+    if len(pid.encode()) > MAX_PID_BYTES:
+        raise ValueError(f"patient ID longer than {MAX_PID_BYTES} bytes: {pid!r}")
+
+
+def now_ns():
+    """Current local wall time in the store's int64 nanosecond format."""
+    return int(np.datetime64(datetime.now(), "ns").view(np.int64))
+
+
+class VitalsDB:
+    """Thread-safe wrapper around one SQLite connection."""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---------- patients ----------
+    def add_patient(self, pid, name="", age=None, gender=""):
+        """Register a patient; returns False if the ID is already taken.
+
+        Raises ValueError for an ID longer than ``MAX_PID_BYTES``.
+        """
+        check_pid(pid)
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO patients VALUES (?, ?, ?, ?, ?)",
+                (pid, name, age, gender, time.time()),
+            )
+        return cur.rowcount == 1
+
+    def patients(self):
+        """``{pid: {"name", "age", "gender"}}`` in insertion order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT pid, name, age, gender FROM patients ORDER BY added"
+            ).fetchall()
+        return {pid: {"name": name, "age": age, "gender": gender} for pid, name, age, gender in rows}
+
+    # ---------- vitals ----------
+    def insert_vitals(self, rows):
+        """Insert ``(pid, t_ns, HR, SpO2, BP, Temp)`` tuples in one transaction."""
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO vitals (pid, t, HR, SpO2, BP, Temp) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def first_id_since(self, t_ns):
+        """Row id just before the first sample at or after ``t_ns``."""
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(id) FROM vitals WHERE t >= ?", (t_ns,)).fetchone()
+        return (row[0] or self.last_id() + 1) - 1
+
+    def last_id(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM vitals").fetchone()[0]
+
+    def read_since(self, last_id, limit=50_000):
+        """Rows with ``id > last_id`` as ``(id, pid, t, HR, SpO2, BP, Temp)``."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, pid, t, HR, SpO2, BP, Temp FROM vitals WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, limit),
+            ).fetchall()
+
+    def prune(self, before_ns):
+        """Drop samples older than ``before_ns``; returns the number removed."""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM vitals WHERE t < ?", (before_ns,)).rowcount
+
+
+def _valid(row):
+    """Whether a ``read_since`` row has a numeric time and finite vitals."""
+    try:
+        return isinstance(row[2], int) and all(math.isfinite(float(x)) for x in row[3:])
+    except (TypeError, ValueError):
+        return False
+
+
+class VitalsFeed:
+    """Copies rows written by the ingestion service into a VitalsStore.
+
+    The first :meth:`poll` backfills the store's retention window; later
+    polls only read rows added since, so a rerun with no new data costs one
+    indexed query.
+    """
+
+    def __init__(self, db, store, batch=50_000):
+        self.db = db
+        self.store = store
+        self.batch = batch
+        retention_ns = int(store.retention_hours * 3600 * 1e9)
+        self.cursor = db.first_id_since(now_ns() - retention_ns)
+        self._resync = False
+
+    def resync(self):
+        """Skip rows older than what the store holds until caught up.
+
+        For taking over after another feed (the shared-memory one) filled
+        the store: the rows since this feed's cursor overlap with its.  The
+        cursor jumps to the oldest patient's newest sample, and rows up to
+        each patient's newest sample are skipped until a poll reads the end
+        of the table.
+        """
+        cols, valid = self.store.tail(1)
+        if valid.any():
+            oldest = int(cols["time"][valid > 0, 0].view(np.int64).min())
+            self.cursor = max(self.cursor, self.db.first_id_since(oldest))
+        self._resync = True
+
+    def poll(self):
+        """Append every new row to the store; returns how many were read.
+
+        At most ``batch`` rows are read per call.  Rows are handed over in
+        batches (one per run of distinct patients, i.e. usually one per
+        ingestion tick) through ``store.append_batch``.
+        """
+        rows = self.db.read_since(self.cursor, self.batch)
+        read = len(rows)
+        if rows:
+            # Advance past bad rows too, or every later poll would stop on them.
+            self.cursor = rows[-1][0]
+            bad = [row for row in rows if not _valid(row)]
+            if bad:
+                log.warning("skipping %d vitals rows with non-numeric values (ids %s...)",
+                            len(bad), [row[0] for row in bad[:5]])
+                rows = [row for row in rows if _valid(row)]
+            if self._resync:
+                self._resync = read == self.batch  # more to read: keep skipping
+                last = {}
+                rows = [row for row in rows
+                        if row[2] > last.setdefault(row[1], self._last_time(row[1]))]
+        start, seen = 0, set()
+        for i, row in enumerate(rows):
+            if row[1] in seen:
+                self._append(rows[start:i])
+                start, seen = i, set()
+            seen.add(row[1])
+        self._append(rows[start:])
+        return read
+
+    def _last_time(self, pid):
+        if pid not in self.store or not self.store.total(pid):
+            return np.iinfo(np.int64).min
+        return int(self.store.window(pid, 1)["time"][0].view(np.int64))
+
+    def _append(self, rows):
+        if not rows:
+            return
+        _, pids, t, *values = zip(*rows)
+        self.store.append_batch(
+            pids, np.array(t, dtype=np.int64).view("datetime64[ns]"),
+            **{v: np.array(col, dtype=float) for v, col in zip(VITALS, values)}
+        )
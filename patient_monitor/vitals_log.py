@@ -0,0 +1,174 @@
+"""Durable, append-only binary vitals log with memory-mapped replay.
+
+The SQLite hand-off only keeps ``keep_hours`` of samples and the in-memory
+store only its retention window.  The log keeps everything: one directory
+per patient, one file per (local) day, each file a flat array of fixed-size
+records::
+
+    <root>/<pid>/<YYYY-MM-DD>.vlog    t:int64 ns | HR:int16 | SpO2:int16 | BP:int16 | Temp:float32
+
+The ingestion service appends in batches (buffered, one ``write`` per file
+per flush).  Readers open files with :class:`numpy.memmap`, so loading a
+whole shift is an ``mmap`` call plus a binary search on the time column; no
+parsing and nothing copied into RAM until a slice is actually used.  A
+record torn by a crash mid-write is ignored on read and cut off before the
+next append to its file.  Files stay sorted by time: a sample older than
+its file's last record (a late device sample) is dropped with a warning.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+
+from .store import COLUMNS, VITALS
+
+DEFAULT_LOG = Path(os.getenv("VITALS_LOG") or Path(__file__).resolve().parent.parent / "vitals_log")
+
+RECORD = np.dtype([("t", "<i8")] + [(v, np.dtype(COLUMNS[v]).newbyteorder("<")) for v in VITALS])
+SUFFIX = ".vlog"
+
+_DAY_NS = 86_400 * 10**9
+
+log = logging.getLogger(__name__)
+
+
+class VitalsLog:
+    """Per-patient, per-day segmented log of fixed-size records.
+
+    :meth:`write` buffers rows and flushes them at most every
+    ``flush_interval`` seconds; ``fsync=True`` also forces them to disk.
+    At most ``max_maps`` files stay memory-mapped (least recently read
+    ones are released first).
+    """
+
+    def __init__(self, root=DEFAULT_LOG, flush_interval=2.0, fsync=False, max_maps=64):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self.max_maps = max_maps
+        self._maps = OrderedDict()  # path -> (records, memmap), least recently used first
+        self._tails = {}  # path -> time of its last record, for files appended to
+
+    # ---------- writing ----------
+    def write(self, rows):
+        """Queue ``(pid, t_ns, HR, SpO2, BP, Temp)`` tuples, as for VitalsDB."""
+        with self._lock:
+            self._buffer.extend(rows)
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    close = flush
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        records = np.array([row[1:] for row in rows], dtype=RECORD)
+        pids = np.array([row[0] for row in rows], dtype=object)
+        days = records["t"] // _DAY_NS
+        groups = defaultdict(list)
+        for i, key in enumerate(zip(pids, days)):
+            groups[key].append(i)
+        for (pid, day), idx in groups.items():
+            path = self._segment(pid, day)
+            path.parent.mkdir(exist_ok=True)
+            chunk = records[idx]
+            chunk = chunk[np.argsort(chunk["t"], kind="stable")]
+            tail = self._tail(path)
+            late = chunk["t"] < tail
+            if late.any():
+                log.warning("dropping %d samples of %s older than its log (%s)", late.sum(), pid, path.name)
+                chunk = chunk[~late]
+                if not len(chunk):
+                    continue
+            self._tails[path] = int(chunk["t"][-1])
+            with open(path, "ab") as f:
+                f.write(chunk.tobytes())
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def _tail(self, path):
+        """Time of the last record in ``path``; cuts off a torn record first."""
+        if path not in self._tails:
+            tail = np.iinfo(np.int64).min
+            if path.exists():
+                size = path.stat().st_size
+                whole = size - size % RECORD.itemsize
+                if whole != size:
+                    log.warning("cutting %d bytes of a torn record off %s", size - whole, path)
+                    os.truncate(path, whole)
+                if whole:
+                    with open(path, "rb") as f:
+                        f.seek(whole - RECORD.itemsize)
+                        tail = int(np.frombuffer(f.read(RECORD.itemsize), RECORD)["t"][0])
+            self._tails[path] = tail
+        return self._tails[path]
+
+    def _segment(self, pid, day):
+        date = np.datetime64(int(day), "D")
+        return self.root / quote(str(pid), safe="") / f"{date}{SUFFIX}"
+
+    # ---------- reading ----------
+    def segments(self, pid):
+        """Paths of ``pid``'s day files, oldest first."""
+        folder = self.root / quote(str(pid), safe="")
+        return sorted(folder.glob(f"*{SUFFIX}")) if folder.is_dir() else []
+
+    def _map(self, path):
+        n = path.stat().st_size // RECORD.itemsize
+        with self._lock:
+            cached = self._maps.pop(path, None)
+            if cached is None or cached[0] != n:
+                data = np.memmap(path, dtype=RECORD, mode="r", shape=(n,)) if n else np.empty(0, RECORD)
+                cached = (n, data)
+            self._maps[path] = cached
+            while len(self._maps) > self.max_maps:
+                # Slices handed out keep their own reference to the mapping.
+                self._maps.popitem(last=False)
+        return cached[1]
+
+    def records(self, pid, start_ns=None, end_ns=None):
+        """Records of ``pid`` with ``start_ns <= t < end_ns`` as a structured array.
+
+        A range inside one day is a read-only view of the memory map; ranges
+        spanning several days are concatenated.
+        """
+        lo_day = None if start_ns is None else start_ns // _DAY_NS
+        hi_day = None if end_ns is None else end_ns // _DAY_NS
+        parts = []
+        for path in self.segments(pid):
+            day = np.datetime64(path.stem, "D").astype(np.int64)
+            if (lo_day is not None and day < lo_day) or (hi_day is not None and day > hi_day):
+                continue
+            data = self._map(path)
+            t = data["t"]
+            lo = 0 if start_ns is None else np.searchsorted(t, start_ns, "left")
+            hi = len(t) if end_ns is None else np.searchsorted(t, end_ns, "left")
+            if hi > lo:
+                parts.append(data[lo:hi])
+        if not parts:
+            return np.empty(0, RECORD)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def read(self, pid, start_ns=None, end_ns=None):
+        """Like :meth:`VitalsStore.window`: ``{"time": datetime64[ns], vital: array}``."""
+        rec = self.records(pid, start_ns, end_ns)
+        out = {"time": rec["t"].view("datetime64[ns]")}
+        out.update({v: rec[v] for v in VITALS})
+        return out
@@ -0,0 +1,65 @@
+"""Ward overview: every patient's latest vitals, alert state and trend.
+
+Everything is computed in one batched pass over the columnar store: one
+``tail`` gather for the sparkline window (whose last column is the latest
+sample), one vectorized alert evaluation and one gather each of the
+incremental NEWS2 scores and trend forecasts, then a single DataFrame that
+the page renders as one ``st.dataframe`` with sparkline columns.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .store import VITALS
+
+SEVERITY_ICON = {"RED": "🔴", "YELLOW": "🟡", "GREEN": "🟢"}
+
+
+def ward_snapshot(registry, alert_engine, spark_points=30, spark_vital="HR", results=None):
+    """One row per patient, most severe alert first.
+
+    Columns: ID, Name, Age, Status, NEWS (early-warning score), Forecast
+    (predicted RED and when, see :mod:`.forecast`), the four vitals and
+    ``<vital> trend`` (a list of the last ``spark_points`` values for a
+    sparkline).  With ``results`` (an
+    :class:`~patient_monitor.shards.AlertResults`) levels and scores come
+    from the alert workers instead of being evaluated here.
+    """
+    with registry.reading():
+        patients = registry.patients()
+        pids = [pid for pid in patients if pid in registry.store]
+        if not pids:
+            return pd.DataFrame()
+        ages = np.array([np.nan if patients[p]["age"] is None else patients[p]["age"] for p in pids], dtype=float)
+        cols, valid = registry.store.tail(spark_points, pids)
+        predicted, eta, vital = registry.forecast.status(pids)
+        if results is None:
+            levels = alert_engine.evaluate_arrays(registry.store, pids, ages)
+            scores = registry.news.latest(pids)[0]
+
+    has_data = valid > 0
+    if results is not None:
+        published = results.levels()
+        levels = np.array([published.get(p, (None, 0))[0] for p in pids], dtype=object)
+        scores = np.array([published.get(p, (None, 0))[1] for p in pids])
+        has_data &= levels != None  # noqa: E711 (elementwise)
+    data = {
+        "ID": pids,
+        "Name": [patients[p]["name"] for p in pids],
+        "Age": ages,
+        "Status": [f"{SEVERITY_ICON.get(lv, '')} {lv}" if ok else "⏳ waiting"
+                   for lv, ok in zip(levels, has_data)],
+    }
+    data["NEWS"] = np.where(has_data, scores, np.nan)
+    data["Forecast"] = [f"🔮 RED ~{max(s / 60, 1):.0f} min ({v})" if p and ok and lv != "RED" else ""
+                        for p, s, v, lv, ok in zip(predicted, eta, vital, levels, has_data)]
+    for v in VITALS:
+        data[v] = np.where(has_data, cols[v][:, -1].astype(float).round(2), np.nan)
+    spark = cols[spark_vital].astype(float)
+    data[f"{spark_vital} trend"] = [row[len(row) - k:].tolist() for row, k in zip(spark, valid)]
+
+    # Most severe level first; within a level predicted RED, then the highest NEWS2 score.
+    order = list(alert_engine.names)
+    rank = np.array([order.index(lv) if ok else len(order) for lv, ok in zip(levels, has_data)])
+    ahead = np.array([f != "" for f in data["Forecast"]], dtype=bool)
+    return pd.DataFrame(data).iloc[np.lexsort((-scores, ~ahead, rank))].reset_index(drop=True)
@@ -0,0 +1,129 @@
+"""LLMClient against a local stub of both providers (no network, no keys)."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from patient_monitor.llm import AIError, Gemini, LLMClient, OpenRouter
+
+
+class _Stub(BaseHTTPRequestHandler):
+    """Answers each provider from its script of replies, then with a full answer.
+
+    A reply is ``(status, headers)`` for an error, ``"answer"`` or ``"cut"``
+    (one token, then the connection drops).
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        provider = "gemini" if "streamGenerateContent" in self.path else "openrouter"
+        server = self.server
+        with server.lock:
+            server.calls.append(provider)
+            script = server.script[provider]
+            reply = script.pop(0) if script else "answer"
+        if reply in ("answer", "cut"):
+            self._stream(provider, ["Hello ", "from ", provider] if reply == "answer" else ["Hello "],
+                         done=reply == "answer")
+        else:
+            status, headers = reply
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+    def _stream(self, provider, words, done):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in words:
+            if provider == "gemini":
+                event = {"candidates": [{"content": {"parts": [{"text": word}]}}]}
+            else:
+                event = {"choices": [{"delta": {"content": word}}]}
+            data = f"data: {json.dumps(event)}\n\n".encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+        if done:
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.close_connection = True
+            self.wfile.write(b"5\r\nda")  # torn chunk
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    server.lock = threading.Lock()
+    server.calls = []
+    server.script = {"openrouter": [], "gemini": []}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(stub, **kwargs):
+    base = f"http://127.0.0.1:{stub.server_address[1]}"
+    kwargs = {"retries": 1, "backoff": 0.01, "max_backoff": 5.0, "timeout": 5, **kwargs}
+    return LLMClient([OpenRouter("k", base_url=base), Gemini("k", base_url=base)], **kwargs)
+
+
+def test_retries_before_answering(stub):
+    stub.script["openrouter"] = [(503, {})]
+    llm = _client(stub)
+    assert llm.complete("hi") == "Hello from openrouter"
+    assert stub.calls == ["openrouter", "openrouter"]
+    assert llm.stats()["openrouter"]["retries"] == 1
+
+
+def test_waits_for_retry_after(stub):
+    stub.script["openrouter"] = [(429, {"Retry-After": "1"})]
+    llm = _client(stub)
+    start = time.monotonic()
+    assert llm.complete("hi") == "Hello from openrouter"
+    assert time.monotonic() - start >= 1.0
+
+
+def test_fails_over_and_cools_down(stub):
+    stub.script["openrouter"] = [(500, {})] * 2
+    llm = _client(stub, cooldown=0.5)
+    assert llm.complete("hi") == "Hello from gemini"
+    assert stub.calls == ["openrouter", "openrouter", "gemini"]
+
+    # While cooling down the failed provider is tried last.
+    assert llm.complete("again") == "Hello from gemini"
+    assert stub.calls[3:] == ["gemini"]
+
+    time.sleep(0.6)
+    assert llm.complete("later") == "Hello from openrouter"
+    assert stub.calls[4:] == ["openrouter"]
+
+
+def test_no_failover_after_first_token(stub):
+    stub.script["openrouter"] = ["cut"]
+    llm = _client(stub)
+    chunks = []
+    with pytest.raises(AIError):
+        for text in llm.stream("hi"):
+            chunks.append(text)
+    assert chunks == ["Hello "]
+    assert stub.calls == ["openrouter"]
+
+
+def test_all_providers_failing(stub):
+    stub.script["openrouter"] = [(500, {})] * 2
+    stub.script["gemini"] = [(400, {})]
+    with pytest.raises(AIError, match="gemini HTTP 400"):
+        _client(stub).complete("hi")
@@ -0,0 +1,67 @@
+"""VitalsFeed taking over from the shared-memory feed after a long backlog."""
+
+import numpy as np
+
+from patient_monitor.store import VITALS, VitalsStore
+from patient_monitor.vitals_db import VitalsDB, VitalsFeed, now_ns
+
+
+def _ticks(pids, ticks, start):
+    return [[(pid, start + k * 10**9, 70 + k % 5, 97, 120, 36.8) for pid in pids] for k in range(ticks)]
+
+
+def test_resync_skips_a_backlog_larger_than_one_batch(tmp_path):
+    db = VitalsDB(tmp_path / "vitals.db")
+    store = VitalsStore(retention_hours=1.0, sample_interval=1.0)
+    feed = VitalsFeed(db, store, batch=50_000)
+    pids = [f"P{i:03d}" for i in range(100)]
+    start = now_ns() - 900 * 10**9
+
+    # The shared-memory feed delivered these while the database feed idled.
+    for rows in _ticks(pids, 600, start):
+        db.insert_vitals(rows)
+        pid, t, *values = zip(*rows)
+        store.append_batch(pid, np.array(t, dtype=np.int64).view("datetime64[ns]"),
+                           **{v: np.array(col, dtype=float) for v, col in zip(VITALS, values)})
+    assert db.last_id() - feed.cursor > feed.batch
+
+    feed.resync()
+    while feed.poll():
+        pass
+    assert {store.total(p) for p in pids} == {600}
+
+    # Rows written after the take-over still arrive.
+    for rows in _ticks(pids, 5, start + 600 * 10**9):
+        db.insert_vitals(rows)
+    while feed.poll():
+        pass
+    for pid in pids:
+        t = store.window(pid)["time"].view(np.int64)
+        assert len(t) == 605 and (np.diff(t) > 0).all()
+
+
+def test_resync_without_a_cursor_jump_keeps_filtering(tmp_path):
+    db = VitalsDB(tmp_path / "vitals.db")
+    store = VitalsStore(retention_hours=1.0, sample_interval=1.0)
+    feed = VitalsFeed(db, store, batch=1_000)
+    pids = [f"P{i:03d}" for i in range(10)]
+    start = now_ns() - 900 * 10**9
+    for rows in _ticks(pids, 300, start):
+        db.insert_vitals(rows)
+        pid, t, *values = zip(*rows)
+        store.append_batch(pid, np.array(t, dtype=np.int64).view("datetime64[ns]"),
+                           **{v: np.array(col, dtype=float) for v, col in zip(VITALS, values)})
+    # One patient lags behind, so the cursor can only move to its newest sample.
+    store.add_patient("LATE")
+    db.insert_vitals([("LATE", start, 70, 97, 120, 36.8)])
+    store.append("LATE", np.datetime64(start, "ns"), 70, 97, 120, 36.8)
+    for rows in _ticks(pids, 10, start + 300 * 10**9):
+        db.insert_vitals(rows)
+
+    feed.resync()
+    polls = 0
+    while feed.poll():
+        polls += 1
+    assert polls > 1
+    assert {store.total(p) for p in pids} == {310}
+    assert store.total("LATE") == 1